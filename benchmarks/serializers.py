@@ -0,0 +1,73 @@
+"""
+Measure the number of releases per second that each serializer streams to a package file.
+
+Usage: python benchmarks/serializers.py [--releases N] [--decimal]
+"""
+
+import tempfile
+import time
+from decimal import Decimal
+from pathlib import Path
+
+import click
+
+from nightingale.config import Output
+from nightingale.serializers import orjson
+from nightingale.writer import DataWriter
+
+
+def make_release(i: int, *, decimal: bool) -> dict:
+    amount = Decimal(f"{i}.10") if decimal else i + 0.1
+    return {
+        "ocid": f"ocds-213czf-{i}",
+        "id": f"{i:064x}",
+        "date": "2022-01-01T00:00:00Z",
+        "tag": ["tender", "award"],
+        "initiationType": "tender",
+        "buyer": {"id": "GB-GOR-1", "name": "Ministério da Saúde"},
+        "tender": {
+            "id": f"T{i}",
+            "title": f"Supply of goods {i}",
+            "status": "complete",
+            "value": {"amount": amount, "currency": "USD"},
+            "items": [
+                {"id": str(j), "description": f"Item {j}", "quantity": j, "unit": {"name": "Unit"}} for j in range(10)
+            ],
+        },
+        "awards": [
+            {
+                "id": f"A{i}-{j}",
+                "status": "active",
+                "value": {"amount": amount, "currency": "USD"},
+                "suppliers": [{"id": f"S{j}", "name": f"Supplier {j}"}],
+            }
+            for j in range(3)
+        ],
+    }
+
+
+@click.command()
+@click.option("--releases", type=click.IntRange(min=1), default=5000, help="Number of releases to stream")
+@click.option("--decimal", is_flag=True, help="Use Decimal amounts, like from a database driver that returns them")
+def main(releases, decimal):
+    data = [make_release(i, decimal=decimal) for i in range(releases)]
+    package_metadata = {"uri": "https://example.com/release-package.json", "publishedDate": "2022-01-01"}
+
+    for serializer in ("simplejson", "orjson"):
+        if serializer == "orjson" and orjson is None:
+            click.echo("orjson: not installed")
+            continue
+        for output_format in ("pretty", "compact"):
+            with tempfile.TemporaryDirectory() as directory:
+                writer = DataWriter(Output(directory=Path(directory), serializer=serializer, format=output_format))
+                start = time.perf_counter()
+                writer.start_package_stream(package_metadata)
+                for release in data:
+                    writer.stream_release(release)
+                writer.end_package_stream()
+                elapsed = time.perf_counter() - start
+            click.echo(f"{serializer} {output_format}: {releases / elapsed:,.0f} releases/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,13 +4,8 @@ import traceback
 
 import click
 import click_pathlib
-from pydantic import TypeAdapter
 
-from nightingale.config import Config
-from nightingale.loader import DataLoader
-from nightingale.mapper import OCDSDataMapper
-from nightingale.publisher import DataPublisher
-from nightingale.writer import DataWriter
+from nightingale.offsets import extract_releases
 
 logger = logging.getLogger(__name__)
 
@@ -40,13 +35,13 @@ def load_config(config_file):
         raise click.ClickException(f"Error decoding TOML from {config_file}.") from None
 
 
-@click.command()
+@click.group(invoke_without_command=True)
+@click.pass_context
 @click.option(
     "--config",
     "config_file",
-    help="Path to the configuration file",
+    help="Path to the configuration file (required, unless running a command)",
     type=click_pathlib.Path(exists=True),
-    required=True,
 )
 @click.option("--package", is_flag=True, default=False, help="Package the data into a release package")
 @click.option("--stream/--no-stream", default=True, help="Enable or disable streaming to the output file")
@@ -71,7 +66,12 @@ def load_config(config_file):
 @click.option("--publisher-uri", type=str, help="Publisher URI")
 @click.option("--extensions", type=str, multiple=True, help="Extension URL")
 @click.option("--output-directory", type=click_pathlib.Path(exists=True), help="Output directory")
+@click.option("--output-format", type=click.Choice(["pretty", "compact", "jsonl"]), help="Output JSON format")
+@click.option(
+    "--workers", type=click.IntRange(min=1), default=1, help="Number of worker processes with which to map OCIDs"
+)
 def main(
+    ctx,
     config_file,
     package,
     stream,
@@ -91,6 +91,8 @@ def main(
     publisher_uri,
     extensions,
     output_directory,
+    output_format,
+    workers,
 ):
     """
     Run the data transformation process.
@@ -100,6 +102,11 @@ def main(
     :param validate_mapping: Flag to indicate whether to validate the mapping template.
     :param loglevel: Logging level.
     """
+    if ctx.invoked_subcommand:
+        return
+    if not config_file:
+        raise click.UsageError("Missing option '--config'.")
+
     setup_logging(loglevel)
     logger.info("Starting data transformation")
 
@@ -112,7 +119,7 @@ def main(
 
         # Apply CLI overrides
         if datasource:
-            config_data["datasource"] = {"connection": datasource}
+            config_data.setdefault("datasource", {})["connection"] = datasource
         if selector:
             try:
                 with selector.open() as f:
@@ -142,7 +149,19 @@ def main(
         if extensions:
             config_data["publishing"]["extensions"] = list(extensions)
         if output_directory:
-            config_data["output"] = {"directory": output_directory}
+            config_data.setdefault("output", {})["directory"] = output_directory
+        if output_format:
+            config_data.setdefault("output", {})["format"] = output_format
+
+        # These modules import pydantic, openpyxl, ocdskit, etc. They are imported here, instead of at the top of the
+        # module, so that --help, commands and usage errors don't wait for them.
+        from pydantic import TypeAdapter
+
+        from nightingale.config import Config
+        from nightingale.loader import DataLoader
+        from nightingale.mapper import OCDSDataMapper
+        from nightingale.publisher import DataPublisher
+        from nightingale.writer import DataWriter
 
         # Validate final configuration
         config = TypeAdapter(Config).validate_python(config_data)
@@ -162,13 +181,16 @@ def main(
             writer.start_package_stream(package_metadata)
 
             # The mapper already has the writer instance, so we can just call map
-            mapper.map(DataLoader(config.datasource), validate_mapping=validate_mapping)
+            mapper.map(DataLoader(config.datasource), validate_mapping=validate_mapping, workers=workers)
             logger.info("Streaming data completed.")
 
+            logger.info("Finalizing stream file...")
+            writer.end_package_stream()
+
         else:
             logger.info("Starting in-memory processing...")
             mapper = OCDSDataMapper(config)
-            ocds_data = mapper.map(DataLoader(config.datasource), validate_mapping=validate_mapping)
+            ocds_data = mapper.map(DataLoader(config.datasource), validate_mapping=validate_mapping, workers=workers)
 
             if package:
                 logger.info("Packaging data...")
@@ -184,9 +206,27 @@ def main(
         click.echo(traceback.format_exc())
         raise click.ClickException(f"Error during transformation: {e}") from None
     finally:
+        # If the stream wasn't finalized, discard the partial output.
         if writer and writer.is_streaming():
-            logger.info("Finalizing stream file...")
-            writer.end_package_stream()
+            logger.warning("Discarding incomplete stream file...")
+            writer.abort_package_stream()
+
+
+@main.command()
+@click.argument("offsets_file", type=click_pathlib.Path(exists=True, dir_okay=False))
+@click.argument("ocid")
+def extract(offsets_file, ocid):
+    """
+    Print the releases with the given OCID, using the offsets recorded while streaming a package.
+
+    OFFSETS_FILE is the .offsets.sqlite file that is written if the offsets option is set in the [output] table.
+    """
+    found = False
+    for release in extract_releases(offsets_file, ocid):
+        click.echo(release)
+        found = True
+    if not found:
+        raise click.ClickException(f"No releases found for {ocid}.")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,54 @@
+import hashlib
+import logging
+import pickle
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+# Increment if the data that is parsed from workbooks changes, to ignore existing cache files.
+CACHE_VERSION = 1
+
+
+def get_digest(path: Path) -> str:
+    """Return the SHA-256 hex digest of the file's contents."""
+    with Path(path).open("rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+def load_cached(path: Path, directory: Path | None, kind: str, parse: Callable[[], Any]) -> Any:
+    """
+    Return the data parsed from a file, from a cache file if one exists for the file's contents.
+
+    If no cache file exists or it can't be read, parse the file and write the cache file. The cache file is a pickle:
+    only use a directory that no one else can write to.
+
+    :param path: The path of the file to parse, like a workbook.
+    :param directory: The directory of the cache files, or ``None`` to parse the file without caching.
+    :param kind: The kind of data, like ``"mapping"``, which prefixes the name of the cache file.
+    :param parse: A function that parses the file and returns the data.
+    """
+    if directory is None:
+        return parse()
+
+    cache_path = Path(directory) / f"{kind}-v{CACHE_VERSION}-{get_digest(path)}.pickle"
+    if cache_path.exists():
+        try:
+            with cache_path.open("rb") as f:
+                data = pickle.load(f)  # noqa: S301 # trusted cache file
+        except Exception:
+            logger.warning("Ignoring unreadable cache file %s", cache_path, exc_info=True)
+        else:
+            logger.debug("Loaded %s from cache file %s", path, cache_path)
+            return data
+
+    data = parse()
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    # Write to a temporary file, so that concurrent processes never read a partial cache file.
+    partial_path = cache_path.with_name(f"{cache_path.name}.partial")
+    with partial_path.open("wb") as f:
+        pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+    partial_path.replace(cache_path)
+    logger.debug("Wrote cache file %s for %s", cache_path, path)
+    return data
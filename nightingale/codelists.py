@@ -1,16 +1,32 @@
 import logging
 from collections import defaultdict
 
-import openpyxl
+from nightingale.cache import load_cached
+from nightingale.workbook import iter_rows, open_workbook
 
 logger = logging.getLogger(__name__)
 
 
 class CodelistsMapping:
-    def __init__(self, config):
+    def __init__(self, config, cache_directory=None):
+        """
+        Load the codelists mapping.
+
+        :param config: The mapping configuration.
+        :param cache_directory: As for :class:`~nightingale.mapping_template.v09.MappingTemplate`.
+        """
         self.config = config
-        self.wb = openpyxl.load_workbook(self.config.codelists, data_only=True)
-        self.codelists = self.load_codelists_mapping()
+        self.wb = None
+        self.codelists = load_cached(config.codelists, cache_directory, "codelists", self.read_workbook)
+
+    def read_workbook(self):
+        """Parse the ``(OCDS)`` sheets, if they aren't cached."""
+        with open_workbook(self.config.codelists) as self.wb:
+            return self.load_codelists_mapping()
+
+    def __getstate__(self):
+        # See MappingTemplate.__getstate__.
+        return {**self.__dict__, "wb": None}
 
     def normmalize_mapping_column(self, mappings):
         """Normalize the mapping column by setting all space separators to one space."""
@@ -33,7 +49,7 @@ class CodelistsMapping:
         mappings = defaultdict(dict)
         in_codelist = False
         codelist = ""
-        for row in sheet.iter_rows(values_only=True):
+        for row in iter_rows(sheet, width=2):
             match row[0]:
                 case "codelist_name":
                     codelist = row[1].split(":")[-1].strip()
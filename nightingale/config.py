@@ -1,18 +1,76 @@
 import tomllib
 from pathlib import Path
+from typing import Literal
 
-from pydantic import Field, TypeAdapter
+from pydantic import Field, TypeAdapter, model_validator
 from pydantic.dataclasses import dataclass
 
 
 @dataclass(frozen=True)
 class Output:
     directory: Path
+    #: The JSON serializer: ``orjson`` (faster, and requires the orjson package), ``simplejson``, or ``auto`` to use
+    #: orjson if installed, or else simplejson.
+    serializer: Literal["auto", "orjson", "simplejson"] = "auto"
+    #: The JSON format: ``pretty`` (indented), ``compact`` (no whitespace), or ``jsonl`` (one compact release per line,
+    #: with the package metadata in a ``.metadata.json`` file).
+    format: Literal["pretty", "compact", "jsonl"] = "pretty"
+    #: The size in bytes of the write buffer.
+    buffer_size: int = Field(default=8_388_608, gt=0)
+    #: Flush the file after this many releases are streamed. If no ``flush_*`` option is set, the file is flushed only
+    #: when the write buffer is full, and when the file is closed.
+    flush_releases: int | None = Field(default=None, gt=0)
+    #: Flush the file after this many bytes are streamed since the last flush.
+    flush_bytes: int | None = Field(default=None, gt=0)
+    #: Flush the file after this many seconds since the last flush, checked when a release is streamed.
+    flush_seconds: float | None = Field(default=None, gt=0)
+    #: Split a streamed package into parts of at most this many releases. Each part is a complete package, and the
+    #: parts are listed in an ``.index.json`` file.
+    max_releases: int | None = Field(default=None, gt=0)
+    #: Split a streamed package into parts of about this many bytes, before compression.
+    max_bytes: int | None = Field(default=None, gt=0)
+    #: Whether to sync files to disk (``fsync``) when flushed, and when closed, before renaming them from their
+    #: temporary ``.partial`` paths to their final paths. The directory is then synced, except on Windows.
+    fsync: bool = False
+    #: Whether to serialize, compress and write streamed releases in a background thread, while releases are mapped.
+    writer_thread: bool = False
+    #: The maximum number of releases waiting for the background thread. When full, mapping waits.
+    writer_queue_size: int = Field(default=1000, gt=0)
+    #: Whether to record the byte offset and length of each streamed release in an ``.offsets.sqlite`` file, to
+    #: extract releases by OCID with ``ocdsnightingale extract``. Not supported with compression.
+    offsets: bool = False
+    #: The compression: ``gzip``, ``zstd`` (requires the zstandard package), or ``None`` for no compression.
+    compression: Literal["gzip", "zstd"] | None = None
+    #: The compression level. Defaults to 6 for gzip (1-9) and 3 for zstd (1-22).
+    compression_level: int | None = None
+    #: The number of threads with which to compress zstd: 0 to compress in the writing thread, or -1 to use all CPUs.
+    compression_threads: int = Field(default=0, ge=-1)
+
+    @model_validator(mode="after")
+    def check_offsets(self) -> "Output":
+        if self.offsets and self.compression:
+            raise ValueError("offsets can't be recorded if compression is set")  # noqa: TRY003 # pydantic
+        return self
 
 
 @dataclass(frozen=True)
 class Datasource:
     connection: str
+    #: The number of rows to fetch from the database at a time.
+    arraysize: int = Field(default=10_000, gt=0)
+    #: Whether to open the database in read-only mode (``mode=ro``).
+    read_only: bool = False
+    #: Whether to open the database as immutable (``immutable=1``), which skips locking and change detection. Only
+    #: enable if nothing else can modify the database, like a snapshot.
+    immutable: bool = False
+    #: The maximum number of bytes of the database to memory-map (``PRAGMA mmap_size``).
+    mmap_size: int | None = None
+    #: The page cache size (``PRAGMA cache_size``): a number of pages if positive, or of KiB if negative.
+    cache_size: int | None = None
+    #: Where to store temporary tables and indices, like those for ``ORDER BY`` (``PRAGMA temp_store``).
+    temp_store: Literal["DEFAULT", "FILE", "MEMORY"] | None = None
+    #: Whether to prevent changes to the database (``PRAGMA query_only``).
+    query_only: bool = False
 
 
 @dataclass(frozen=True)
@@ -44,6 +102,13 @@ class Mapping:
     #: OCDS paths at which to keep source values that aren't in the codelist, instead of discarding them.
     #: Useful when values are derived via SQL logic (e.g. CASE expressions) and are absent from the codelist file.
     codelist_passthrough_paths: tuple[str, ...] = ()
+    #: Directory in which to cache the data parsed from the mapping and codelists workbooks, keyed by the workbooks'
+    #: contents, so that later runs and worker processes don't parse the workbooks again. The cache files are pickles:
+    #: only use a directory that no one else can write to.
+    cache_directory: Path | None = None
+    #: How to generate release IDs: ``sha256`` hashes the release's canonical JSON, or ``dict_hash`` uses the
+    #: dict_hash package, which is much slower, but produces the same IDs as versions before 0.0.3.
+    release_id_hash: Literal["sha256", "dict_hash"] = "sha256"
 
 
 @dataclass(frozen=True)
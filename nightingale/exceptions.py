@@ -7,3 +7,10 @@ class StreamNotStartedError(NightingaleError):
 
     def __init__(self):
         super().__init__("Stream writing has not been started. Call start_package_stream() first.")
+
+
+class MissingDependencyError(NightingaleError):
+    """Raised when an option requires an optional dependency that isn't installed."""
+
+    def __init__(self, package, feature):
+        super().__init__(f"The {package} package is required for {feature}. Install it with: pip install {package}")
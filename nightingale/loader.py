@@ -1,5 +1,8 @@
+import itertools
 import logging
 import sqlite3
+from pathlib import Path
+from urllib.parse import urlencode
 
 logger = logging.getLogger(__name__)
 
@@ -16,6 +19,35 @@ class DataLoader:
         cursor.execute(selector)
         return (dict(row) for row in cursor)
 
+    def select(self, selector):
+        """
+        Execute the selector, and return the names of its result columns and an iterator of its rows.
+
+        Unlike :meth:`load`, rows are plain tuples, to avoid building a dictionary per row. Use the column names to
+        read values by position.
+
+        :param selector: The SQL query.
+        :return: The column names, and the rows as tuples.
+        """
+        columns, batches = self.select_batches(selector)
+        return columns, itertools.chain.from_iterable(batches)
+
+    def select_batches(self, selector):
+        """
+        Execute the selector, and return the names of its result columns and an iterator of batches of its rows.
+
+        Rows are fetched with ``fetchmany``, ``arraysize`` rows at a time.
+
+        :param selector: The SQL query.
+        :return: The column names, and lists of rows as tuples.
+        """
+        cursor = self.get_cursor()
+        cursor.row_factory = None
+        cursor.arraysize = self.config.arraysize
+        cursor.execute(selector)
+        columns = [column[0] for column in cursor.description]
+        return columns, iter(cursor.fetchmany, [])
+
     def get_cursor(self):
         conn = self.get_connection()
         return conn.cursor()
@@ -23,8 +55,20 @@ class DataLoader:
     def get_connection(self):  # SQLite-specific
         if self._connection:
             return self._connection
-        conn = sqlite3.connect(self.config.connection)
+        if self.config.read_only or self.config.immutable:
+            parameters = {"mode": "ro"} if self.config.read_only else {}
+            if self.config.immutable:
+                parameters["immutable"] = 1
+            uri = f"{Path(self.config.connection).absolute().as_uri()}?{urlencode(parameters)}"
+            conn = sqlite3.connect(uri, uri=True)
+        else:
+            conn = sqlite3.connect(self.config.connection)
         conn.row_factory = sqlite3.Row
+        for pragma in ("mmap_size", "cache_size", "temp_store"):
+            if (value := getattr(self.config, pragma)) is not None:
+                conn.execute(f"PRAGMA {pragma} = {value}")
+        if self.config.query_only:
+            conn.execute("PRAGMA query_only = ON")
         self._connection = conn
         logger.info("Connected to %s", self.config.connection)
         return conn
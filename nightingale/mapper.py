@@ -1,6 +1,10 @@
 import logging
+import multiprocessing
 import sqlite3
 import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
 from typing import Any
 
 import dict_hash
@@ -9,12 +13,14 @@ from nightingale.codelists import CodelistsMapping
 from nightingale.config import Config
 from nightingale.mapping_template.v09 import MappingTemplate
 from nightingale.mapping_template.validator import MappingTemplateValidator
+from nightingale.plan import MappingPlan
 from nightingale.util import (
     get_iso_now,
-    group_contiguous_mappings,
+    group_rows_by_ocid,
+    hash_release,
     is_new_array,
+    prune_dicts_without_id,
     remove_dicts_without_id,
-    sort_group_by_parent_and_id,
 )
 from nightingale.writer import DataWriter
 
@@ -34,22 +40,70 @@ class OCDSDataMapper:
     :type config: Config
     """
 
-    def __init__(self, config: Config, writer: DataWriter | None = None):
+    def __init__(
+        self,
+        config: Config,
+        writer: DataWriter | None = None,
+        *,
+        mapping: MappingTemplate | None = None,
+        codelists: CodelistsMapping | None = None,
+    ):
         """
         Initialize the OCDSDataMapper.
 
         :param config: Configuration object containing settings for the mapper.
         :type config: Config
         :param writer: Optional DataWriter instance for streaming output.
+        :param mapping: The already loaded mapping template, if any, in which case the codelists aren't loaded either.
+        :param codelists: The already loaded codelists mapping, if ``mapping`` is set.
         """
         self.config = config
-        self.mapping = MappingTemplate(config.mapping)
         self.writer = writer
-        self.codelists = None
-        if self.config.mapping.codelists:
-            self.codelists = CodelistsMapping(self.config.mapping)
+        if mapping is None:
+            self.mapping = MappingTemplate(config.mapping, config.mapping.cache_directory)
+            self.codelists = None
+            if self.config.mapping.codelists:
+                self.codelists = CodelistsMapping(self.config.mapping, config.mapping.cache_directory)
+        else:
+            self.mapping = mapping
+            self.codelists = codelists
 
         self.milestone_lookup = {}
+        # The plan compiled from the mapping template, and the plan bound to the selector's columns, if any.
+        self._compiled: MappingPlan | None = None
+        self._plan: MappingPlan | None = None
+
+    def get_compiled_plan(self, mapping: MappingTemplate) -> MappingPlan:
+        """
+        Return the mapping plan compiled from the mapping template, compiling it on first use.
+
+        :param mapping: Mapping configuration object.
+        :return: The compiled mapping plan, which isn't bound to any columns.
+        """
+        if self._compiled is None or self._compiled.template is not mapping:
+            self._compiled = MappingPlan(mapping)
+        return self._compiled
+
+    def get_plan(self, mapping: MappingTemplate) -> MappingPlan:
+        """
+        Return the mapping plan with which to map rows: the bound plan, if bound with :meth:`bind_plan`.
+
+        :param mapping: Mapping configuration object.
+        :return: The bound mapping plan, or else the compiled mapping plan.
+        """
+        if self._plan is not None and self._plan.template is mapping:
+            return self._plan
+        return self.get_compiled_plan(mapping)
+
+    def bind_plan(self, columns: list[str]) -> None:
+        """
+        Bind the mapping plan to the selector's result columns, to map rows that are tuples of these columns.
+
+        The compiled plan is bound, rather than any previously bound plan, whose unselected mappings were pruned.
+
+        :param columns: The result columns of the selector.
+        """
+        self._plan = self.get_compiled_plan(self.mapping).bind(columns)
 
     def produce_ocid(self, value: str) -> str:
         """
@@ -62,12 +116,13 @@ class OCDSDataMapper:
         """
         return f"{self.config.mapping.ocid_prefix}-{value}"
 
-    def map(self, loader: Any, *, validate_mapping: bool = False) -> list[dict[str, Any]]:
+    def map(self, loader: Any, *, validate_mapping: bool = False, workers: int = 1) -> list[dict[str, Any]]:
         """
         Map data from the loader to the OCDS format.
 
         :param loader: Data loader object.
         :type loader: Any
+        :param workers: The number of worker processes. If greater than 1, map OCIDs in parallel.
         :return: List of mapped release dictionaries.
         :rtype: list[dict[str, Any]]
         """
@@ -84,14 +139,17 @@ class OCDSDataMapper:
             logger.warning("split_milestone_codes is enabled but no milestone lookup data is available.")
 
         logger.info("Mapping data loaded")
-        data = loader.load(config.selector)
+        columns, data = loader.select(config.selector)
         logger.info("Start fetching rows from datasource")
         if validate_mapping:
             logger.info("Validating mapping template...")
             validator = MappingTemplateValidator(loader, self.mapping)
             validator.validate_data_elements()
-            validator.validate_selector(data[0])
+            validator.validate_selector(columns)
+        self.bind_plan(columns)
         logger.info("Start mapping data")
+        if workers > 1:
+            return self.transform_data_parallel(data, self.mapping, workers=workers, columns=columns)
         return self.transform_data(data, self.mapping, codelists=self.codelists)
 
     def transform_data(
@@ -108,6 +166,7 @@ class OCDSDataMapper:
         curr_release = {}
         curr_release_dates = set()
         array_counters = {}
+        array_index = ArrayIdIndex()
         mapped = []
         count = 0
         ocids = 0
@@ -116,8 +175,9 @@ class OCDSDataMapper:
         start_time_ocid = None
 
         ocid_mapping = mapping.get_ocid_mapping()
+        plan = self.get_plan(mapping)
         for row in data:
-            ocid = row.get(ocid_mapping, "")
+            ocid = plan.get_value(row, ocid_mapping)
 
             if not ocid:
                 logger.warning("No OCID found in row: %s. Skipping.", row)
@@ -141,6 +201,7 @@ class OCDSDataMapper:
                 curr_ocid = ocid
                 curr_release = {}
                 array_counters = {}
+                array_index = ArrayIdIndex()
                 curr_release_dates = set()
                 start_time_ocid = time.time()
                 ocids += 1
@@ -154,6 +215,7 @@ class OCDSDataMapper:
                 array_counters=array_counters,
                 codelists=codelists,
                 curr_release_dates=curr_release_dates,
+                array_index=array_index,
             )
             count += 1
             if count % LARGE_RELEASE_ROW_THRESHOLD == 0:
@@ -176,18 +238,118 @@ class OCDSDataMapper:
         logger.info("Slow releases (>5 hours): %s", slow_ocids)
         return mapped
 
+    def transform_data_parallel(
+        self, data: list[dict[Any, Any]], mapping: MappingTemplate, *, workers: int, columns: list[str] | None = None
+    ) -> list[dict[str, Any]]:
+        """
+        Transform the input data to the OCDS format, mapping OCIDs in parallel in worker processes.
+
+        The worker processes are spawned, rather than forked, as the writer's background thread might be running. They
+        receive the loaded mapping template and codelists, instead of loading them again. The rows of each OCID are
+        sent to a worker, and the finished releases are written or returned in the order of the input data. At most
+        two OCIDs per worker are in flight at any time, to bound memory use.
+
+        :param data: List of input data dictionaries.
+        :param mapping: Mapping configuration object.
+        :param workers: The number of worker processes.
+        :param columns: The result columns of the selector, to which workers bind their mapping plans.
+        :return: List of transformed release dictionaries.
+        """
+        mapped = []
+        ocids = 0
+        large_ocids = {}
+        slow_ocids = {}
+        pending = deque()
+
+        def collect():
+            ocid, count, future = pending.popleft()
+            release, duration = future.result()
+            self.write_release(release, mapped)
+            minutes, seconds = divmod(int(duration), 60)
+            logger.info("Release mapped: %s in %dm %ds", self.produce_ocid(ocid), minutes, seconds)
+            if count >= LARGE_RELEASE_ROW_THRESHOLD:
+                large_ocids[ocid] = count
+            if duration > SLOW_RELEASE_SECONDS:
+                slow_ocids[ocid] = round(duration / 60, 1)
+
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(
+                self.config,
+                mapping,
+                self.codelists,
+                self.milestone_lookup,
+                columns,
+                logging.getLogger().getEffectiveLevel(),
+            ),
+        ) as executor:
+            plan = self.get_plan(mapping)
+            ocid_mapping = mapping.get_ocid_mapping()
+            for ocid, rows in group_rows_by_ocid(data, lambda row: plan.get_value(row, ocid_mapping)):
+                pending.append((ocid, len(rows), executor.submit(_map_release, ocid, rows)))
+                ocids += 1
+                if len(pending) >= 2 * workers:
+                    collect()
+            while pending:
+                collect()
+
+        logger.info("Created %d unique releases", ocids)
+        logger.info("A really gigantic releases (> 500K rows): %s", large_ocids)
+        logger.info("Slow releases (>5 hours): %s", slow_ocids)
+        return mapped
+
+    def transform_release(
+        self,
+        ocid: str,
+        rows: list[dict[Any, Any]],
+        mapping: MappingTemplate,
+        codelists: CodelistsMapping | None = None,
+    ) -> dict[str, Any]:
+        """
+        Transform the input rows of one OCID to a finished release.
+
+        :param ocid: The OCID, without the prefix.
+        :param rows: List of input data dictionaries with this OCID.
+        :param mapping: Mapping configuration object.
+        :return: The finished release.
+        """
+        release = {}
+        array_counters = {}
+        array_index = ArrayIdIndex()
+        release_dates = set()
+        for row in rows:
+            release = self.transform_row(
+                row,
+                mapping,
+                mapping.get_schema(),
+                release,
+                array_counters=array_counters,
+                codelists=codelists,
+                curr_release_dates=release_dates,
+                array_index=array_index,
+            )
+        mapped = []
+        self.finish_release(ocid, release, mapped, max(release_dates) if release_dates else None)
+        return mapped[0]
+
     def finish_release(self, curr_ocid, curr_release, mapped, release_date):
-        curr_release = self.remove_empty_id_arrays(curr_release)
+        # The release is pruned in place, instead of copied like with remove_empty_id_arrays, as it's built per OCID.
+        prune_dicts_without_id(curr_release)
         self.tag_initiation_type(curr_release)
         self.date_release(curr_release, release_date)
         self.tag_ocid(curr_release, curr_ocid)
         self.generate_tags(curr_release)
         self.make_release_id(curr_release)
+        self.write_release(curr_release, mapped)
 
+    def write_release(self, release, mapped):
+        """Stream the release to the writer, if streaming, or else append it to the mapped releases."""
         if self.writer and self.writer.is_streaming():
-            self.writer.stream_release(curr_release)
+            self.writer.stream_release(release)
         else:
-            mapped.append(curr_release)
+            mapped.append(release)
 
     def transform_row(
         self,
@@ -198,6 +360,8 @@ class OCDSDataMapper:
         array_counters: dict | None = None,
         codelists: CodelistsMapping | None = None,
         curr_release_dates: set[str] | None = None,
+        *,
+        array_index: "ArrayIdIndex | None" = None,
     ) -> dict:
         """
         Transform a single row of input data to the OCDS format.
@@ -222,25 +386,23 @@ class OCDSDataMapper:
             for i, key in enumerate(keys[:-1]):
                 subpath = "/" + "/".join(keys[: i + 1])
                 if isinstance(nested_dict, list):
-                    nested_dict = self.shift_current_array(nested_dict, subpath, array_counters)
+                    nested_dict = self.shift_current_array(nested_dict, subpath, array_counters, array_index)
                 if key not in nested_dict:
                     nested_dict[key] = [] if schema.get(subpath, {}).get("type") == "array" else {}
                 nested_dict = nested_dict[key]
             subpath = "/" + "/".join(keys[:-1])
             if schema.get(keys_path, {}).get("type") == "array" and isinstance(nested_dict, list) and nested_dict:
-                nested_dict = self.shift_current_array(nested_dict, subpath, array_counters)
+                nested_dict = self.shift_current_array(nested_dict, subpath, array_counters, array_index)
 
             if isinstance(nested_dict, list):
                 if keys_path.startswith("/contracts/milestones"):
-                    contract_id_map = mapping_config.get_mapping_for("/contracts/id")
-                    if contract_id_map:
-                        contract_id_col = contract_id_map[0]["mapping"]
-                        contract_id = input_data.get(contract_id_col)
-                        nested_dict = find_array_element_by_id(nested_dict, contract_id)
+                    if plan.contract_id_column is not None:
+                        contract_id = plan.get_value(input_data, plan.contract_id_column)
+                        nested_dict = array_index.find(nested_dict, contract_id)
                     else:
-                        nested_dict = self.shift_current_array(nested_dict, keys_path, array_counters)
+                        nested_dict = self.shift_current_array(nested_dict, keys_path, array_counters, array_index)
                 else:
-                    nested_dict = self.shift_current_array(nested_dict, keys_path, array_counters)
+                    nested_dict = self.shift_current_array(nested_dict, keys_path, array_counters, array_index)
 
                 if add_new:
                     if last_key not in nested_dict:
@@ -267,7 +429,9 @@ class OCDSDataMapper:
 
         if not result:
             result = {}
-        datetime_paths = self.mapping.get_datetime_fields()
+        if array_index is None:
+            array_index = ArrayIdIndex()
+        plan = self.get_plan(mapping_config)
 
         contract_milestones_processed_for_this_row = False
 
@@ -275,185 +439,164 @@ class OCDSDataMapper:
 
         if result and result.get("tender", {}).get("selectionCriteria", {}).get("criteria", None):
             skip_criteria_processing = True
-        contiguous_groups = group_contiguous_mappings(self.mapping.get_mappings())
-        for _block, group in contiguous_groups:
-            sorted_group = sort_group_by_parent_and_id(group)
-            for mapping in sorted_group:
-                flat_col = mapping["mapping"]
-                if not flat_col:
-                    continue
-                value = input_data.get(flat_col)
-                if not value:
-                    continue
-                path = mapping["path"]
+        for step, value in plan.match(input_data):
+            path = step.path
 
-                if contract_milestones_processed_for_this_row and path.startswith("/contracts/milestones/"):
-                    continue
+            if contract_milestones_processed_for_this_row and path.startswith("/contracts/milestones/"):
+                continue
 
-                if self.config.mapping.split_milestone_codes and path in {
-                    "/contracts/milestones/id",
-                    "/contracts/milestones/type",
-                    "/contracts/milestones/status",
-                }:
-                    code_mapping = mapping_config.get_mapping_for("/contracts/milestones/code")
-                    if code_mapping:
-                        code_col = code_mapping[0]["mapping"]
-                        code_val = input_data.get(code_col)
-                        if isinstance(code_val, str) and " " in code_val:
-                            continue
+            if (
+                self.config.mapping.split_milestone_codes
+                and plan.milestone_code_column is not None
+                and path in {"/contracts/milestones/id", "/contracts/milestones/type", "/contracts/milestones/status"}
+            ):
+                code_val = plan.get_value(input_data, plan.milestone_code_column)
+                if isinstance(code_val, str) and " " in code_val:
+                    continue
 
-                if (
-                    self.config.mapping.split_milestone_codes
-                    and path == "/contracts/milestones/code"
-                    and isinstance(value, str)
-                    and " " in value
-                ):
-                    current_contract_id = None
-                    contract_id_map = mapping_config.get_mapping_for("/contracts/id")
-                    if contract_id_map:
-                        contract_id_col = contract_id_map[0]["mapping"]
-                        current_contract_id = input_data.get(contract_id_col)
-
-                    if current_contract_id:
+            if (
+                self.config.mapping.split_milestone_codes
+                and path == "/contracts/milestones/code"
+                and isinstance(value, str)
+                and " " in value
+            ):
+                current_contract_id = None
+                if plan.contract_id_column is not None:
+                    current_contract_id = plan.get_value(input_data, plan.contract_id_column)
+
+                if current_contract_id:
+                    found_contract = array_index.find(result.get("contracts", []), current_contract_id)
+                    if found_contract and found_contract.get("id") != current_contract_id:
                         found_contract = None
-                        for contract in result.get("contracts", []):
-                            if contract.get("id") == current_contract_id:
-                                found_contract = contract
-                                break
-
-                        known_codes = set(self.milestone_lookup)
-                        if (
-                            found_contract
-                            and found_contract.get("milestones")
-                            and known_codes
-                            and any(m.get("code") in known_codes for m in found_contract["milestones"])
-                        ):
-                            contract_milestones_processed_for_this_row = True
-                            continue
-                    codes = value.split()
-                    if not codes:
-                        continue
 
-                    base_id_map = mapping_config.get_mapping_for("/contracts/milestones/id")
-                    type_map = mapping_config.get_mapping_for("/contracts/milestones/type")
-                    status_map = mapping_config.get_mapping_for("/contracts/milestones/status")
+                    known_codes = set(self.milestone_lookup)
+                    if (
+                        found_contract
+                        and found_contract.get("milestones")
+                        and known_codes
+                        and any(m.get("code") in known_codes for m in found_contract["milestones"])
+                    ):
+                        contract_milestones_processed_for_this_row = True
+                        continue
+                codes = value.split()
+                if not codes:
+                    continue
 
-                    base_id_col = base_id_map[0]["mapping"] if base_id_map else None
-                    type_col = type_map[0]["mapping"] if type_map else None
-                    status_col = status_map[0]["mapping"] if status_map else None
+                base_id_col = plan.milestone_id_column
+                type_col = plan.milestone_type_column
+                status_col = plan.milestone_status_column
 
-                    base_id = input_data.get(base_id_col, "") if base_id_col else ""
-                    m_type = input_data.get(type_col) if type_col else None
-                    m_status = input_data.get(status_col) if status_col else None
+                base_id = plan.get_value(input_data, base_id_col) if base_id_col else ""
+                m_type = plan.get_value(input_data, type_col) if type_col else None
+                m_status = plan.get_value(input_data, status_col) if status_col else None
 
-                    for code in codes:
-                        title = None
-                        description = None
-                        if lookup_data := self.milestone_lookup.get(code):
-                            title = lookup_data.get("title")
-                            description = lookup_data.get("description")
+                for code in codes:
+                    title = None
+                    description = None
+                    if lookup_data := self.milestone_lookup.get(code):
+                        title = lookup_data.get("title")
+                        description = lookup_data.get("description")
 
-                        milestone_obj = {
-                            "id": f"{base_id}-{code}" if base_id else code,
-                            "title": title,
-                            "type": m_type,
-                            "description": description,
-                            "code": code,
-                            "status": m_status,
-                        }
+                    milestone_obj = {
+                        "id": f"{base_id}-{code}" if base_id else code,
+                        "title": title,
+                        "type": m_type,
+                        "description": description,
+                        "code": code,
+                        "status": m_status,
+                    }
 
-                        milestone_obj = {k: v for k, v in milestone_obj.items() if v is not None}
+                    milestone_obj = {k: v for k, v in milestone_obj.items() if v is not None}
 
-                        milestone_keys = path.strip("/").split("/")[:-1]  # ['contracts', 'milestones']
-                        set_nested_value(result, milestone_keys, milestone_obj, flattened_schema, add_new=True)
+                    milestone_keys = step.keys[:-1]  # ('contracts', 'milestones')
+                    set_nested_value(result, milestone_keys, milestone_obj, flattened_schema, add_new=True)
 
-                    contract_milestones_processed_for_this_row = True
-                    continue
+                contract_milestones_processed_for_this_row = True
+                continue
 
-                if path.startswith("/contracts/milestones/") and contract_milestones_processed_for_this_row:
-                    continue
+            if path.startswith("/contracts/milestones/") and contract_milestones_processed_for_this_row:
+                continue
 
-                if "/tender/selectionCriteria/criteria" in path and skip_criteria_processing:
+            if "/tender/selectionCriteria/criteria" in path and skip_criteria_processing:
+                continue
+            if step.is_datetime:
+                curr_release_dates.add(value)
+            keys = step.keys
+            if array_path := step.array_path:
+                child_path = step.child_path
+                last_key_name = keys[-1]
+                array_value = value
+                if path == array_path:
+                    if "criteria" in path:
+                        tender = result.get("tender", {})
+                        selection = tender.get("selectionCriteria")
+                        if selection:
+                            criteria = selection.get("criteria", [])
+                            if not criteria:
+                                criteria.append({last_key_name: [value]})
+                            else:
+                                for criterion in criteria:
+                                    if last_key_name not in criterion:
+                                        criterion[last_key_name] = [value]
+                                        break
+                            continue
+                    set_nested_value(result, keys, value, flattened_schema, add_new=True, append_once=True)
                     continue
-                if path in datetime_paths and value:
-                    curr_release_dates.add(value)
-                keys = path.strip("/").split("/")
-                if array_path := mapping_config.get_containing_array_path(path):
-                    child_path = path[len(array_path) :]
-                    last_key_name = keys[-1]
-                    array_value = value
-                    if path == array_path:
+                if "criteria" in path:
+                    if (
+                        child_path != "criteria"
+                        and result.get("tender")
+                        and result["tender"].get("selectionCriteria", None)
+                        and (
+                            len(result["tender"]["selectionCriteria"]["criteria"]) == 0
+                            or last_key_name in result["tender"]["selectionCriteria"]["criteria"][-1]
+                        )
+                    ):
+                        result["tender"]["selectionCriteria"]["criteria"].append({})
+                elif array_path in array_counters:
+                    if add_new := is_new_array(array_counters, child_path, last_key_name, array_value, array_path):
+                        array_counters[array_path] = array_value
+                        set_nested_value(result, keys[:-1], {}, flattened_schema, add_new=add_new)
+                elif last_key_name == "id":
+                    array_counters[array_path] = array_value
+                    set_nested_value(result, keys[:-1], {}, flattened_schema, add_new=True)
+
+                current: Any = result
+                for i, key in enumerate(keys[:-1]):
+                    current_path = "/" + "/".join(keys[: i + 1])
+                    is_array = flattened_schema.get(current_path, {}).get("type") == "array"
+                    if key not in current:
+                        current[key] = [] if is_array else {}
+                    current = current[key]
+                    if is_array:
                         if "criteria" in path:
-                            tender = result.get("tender", {})
-                            selection = tender.get("selectionCriteria")
-                            if selection:
-                                criteria = selection.get("criteria", [])
-                                if not criteria:
-                                    criteria.append({last_key_name: [value]})
-                                else:
-                                    for criterion in criteria:
-                                        if last_key_name not in criterion:
-                                            criterion[last_key_name] = [value]
+                            if child_path != "criteria" and result["tender"].get("selectionCriteria", None):
+                                for index, criterion in enumerate(result["tender"]["selectionCriteria"]["criteria"]):
+                                    if last_key_name not in criterion or len(criterion) == 0:
+                                        if last_key_name != "minimum":
+                                            current = result["tender"]["selectionCriteria"]["criteria"][index]
+                                            break
+                                        if len(criterion) == 0 or criterion.get("type", "") == "economic":
+                                            current = result["tender"]["selectionCriteria"]["criteria"][index]
                                             break
-                                continue
-                        set_nested_value(result, keys, value, flattened_schema, add_new=True, append_once=True)
-                        continue
-                    if "criteria" in path:
-                        if (
-                            child_path != "criteria"
-                            and result.get("tender")
-                            and result["tender"].get("selectionCriteria", None)
-                            and (
-                                len(result["tender"]["selectionCriteria"]["criteria"]) == 0
-                                or last_key_name in result["tender"]["selectionCriteria"]["criteria"][-1]
-                            )
-                        ):
-                            result["tender"]["selectionCriteria"]["criteria"].append({})
-                    elif array_path in array_counters:
-                        if add_new := is_new_array(array_counters, child_path, last_key_name, array_value, array_path):
-                            array_counters[array_path] = array_value
-                            set_nested_value(result, keys[:-1], {}, flattened_schema, add_new=add_new)
-                    elif last_key_name == "id":
-                        array_counters[array_path] = array_value
-                        set_nested_value(result, keys[:-1], {}, flattened_schema, add_new=True)
-
-                    current: Any = result
-                    for i, key in enumerate(keys[:-1]):
-                        current_path = "/" + "/".join(keys[: i + 1])
-                        is_array = flattened_schema.get(current_path, {}).get("type") == "array"
-                        if key not in current:
-                            current[key] = [] if is_array else {}
-                        current = current[key]
-                        if is_array:
-                            if "criteria" in path:
-                                if child_path != "criteria" and result["tender"].get("selectionCriteria", None):
-                                    for index, criterion in enumerate(
-                                        result["tender"]["selectionCriteria"]["criteria"]
-                                    ):
-                                        if last_key_name not in criterion or len(criterion) == 0:
-                                            if last_key_name != "minimum":
-                                                current = result["tender"]["selectionCriteria"]["criteria"][index]
-                                                break
-                                            if len(criterion) == 0 or criterion.get("type", "") == "economic":
-                                                current = result["tender"]["selectionCriteria"]["criteria"][index]
-                                                break
 
-                            else:
-                                current = self.shift_current_array(current, current_path, array_counters)
+                        else:
+                            current = self.shift_current_array(current, current_path, array_counters, array_index)
 
-                    value = self.map_codelist_value(keys, flattened_schema, codelists, value)
-                    if isinstance(current, list):
-                        array_path = mapping_config.get_containing_array_path("/" + "/".join(keys))
-                        current = self.shift_current_array(current, array_path, array_counters)
-                    current[last_key_name] = value
-                else:
-                    set_nested_value(result, keys, value, flattened_schema)
+                if isinstance(current, list):
+                    current = self.shift_current_array(current, array_path, array_counters, array_index)
+                current[last_key_name] = self.map_code(path, step.codelist, codelists, value)
+            else:
+                set_nested_value(result, keys, value, flattened_schema)
         return result
 
-    def shift_current_array(self, current, array_path, array_counters):
+    def shift_current_array(self, current, array_path, array_counters, array_index=None):
         if not current:
             current.append({})
-        return find_array_element_by_id(current, array_counters.get(array_path) if array_counters else None)
+        array_element_id = array_counters.get(array_path) if array_counters else None
+        if array_index is None:
+            return find_array_element_by_id(current, array_element_id)
+        return array_index.find(current, array_element_id)
 
     def make_release_id(self, curr_row: dict) -> None:
         """
@@ -462,7 +605,10 @@ class OCDSDataMapper:
         :param curr_row: The current release row dictionary.
         :type curr_row: dict
         """
-        curr_row["id"] = dict_hash.sha256(curr_row)
+        if self.config.mapping.release_id_hash == "dict_hash":
+            curr_row["id"] = dict_hash.sha256(curr_row)
+        else:
+            curr_row["id"] = hash_release(curr_row)
 
     def date_release(self, curr_row: dict, curr_date: str | None) -> None:
         """
@@ -539,7 +685,10 @@ class OCDSDataMapper:
 
     def map_codelist_value(self, keys, schema, codelists, value):
         path = "/" + "/".join(keys)
-        if codelist := schema.get(path, {}).get("codelist"):
+        return self.map_code(path, schema.get(path, {}).get("codelist"), codelists, value)
+
+    def map_code(self, path, codelist, codelists, value):
+        if codelist:
             codelist = codelists.get_mapping_for_codelist(codelist)
             if codelist:
                 if new_value := codelist.get(value):
@@ -578,3 +727,80 @@ def find_array_element_by_id(current, array_element_id):
         if item.get("id") == array_element_id:
             return item
     return current[-1] if current else None
+
+
+#: The mapper of a worker process, set by :func:`_init_worker`.
+_worker_mapper: OCDSDataMapper | None = None
+
+
+def _init_worker(
+    config: Config,
+    mapping: MappingTemplate,
+    codelists: CodelistsMapping | None,
+    milestone_lookup: dict,
+    columns: list[str] | None,
+    loglevel: int,
+) -> None:
+    global _worker_mapper  # noqa: PLW0603
+    # A spawned process doesn't inherit the logging configuration.
+    logging.basicConfig(level=loglevel)
+    _worker_mapper = OCDSDataMapper(config, mapping=mapping, codelists=codelists)
+    _worker_mapper.milestone_lookup = milestone_lookup
+    if columns is not None:
+        _worker_mapper.bind_plan(columns)
+
+
+def _map_release(ocid: str, rows: list[dict[Any, Any]]) -> tuple[dict[str, Any], float]:
+    start = time.time()
+    release = _worker_mapper.transform_release(ocid, rows, _worker_mapper.mapping, _worker_mapper.codelists)
+    return release, time.time() - start
+
+
+class ArrayIdIndex:
+    """
+    Index the elements of the arrays in a release by ``id``, to find them in constant time.
+
+    :meth:`find` returns the same element as :func:`find_array_element_by_id`. Arrays are indexed incrementally, as
+    they grow. The last element of an array isn't indexed, because the mapper can still set its ``id``: for example,
+    it appends ``{}`` and sets the ``id`` on the next write. The mapper only modifies other elements after finding them
+    by ``id``, so their entries remain valid.
+
+    Use one index per release.
+    """
+
+    def __init__(self):
+        # id(array) -> [array, {element id: first element with that id}, number of elements indexed]
+        self._arrays = {}
+
+    def find(self, current, array_element_id):
+        """
+        Find the first dictionary in a list that contains the given 'id' value, or the last dictionary if not found.
+
+        :param current: List[Dict], a list of dictionaries to search.
+        :param array_element_id: Any, the target 'id' value to search for.
+        :return: Dict, the dictionary with the matching 'id' value, or the last dictionary if not found.
+        """
+        if not current:
+            return None
+        entry = self._arrays.get(id(current))
+        if entry is None or entry[0] is not current:
+            entry = self._arrays[id(current)] = [current, {}, 0]
+        item = self._lookup(entry, array_element_id)
+        if item is not None and item.get("id") != array_element_id:
+            # The element's id changed after it was indexed. Rebuild the array's index.
+            entry[1:] = [{}, 0]
+            item = self._lookup(entry, array_element_id)
+        if item is not None:
+            return item
+        return current[-1]
+
+    @staticmethod
+    def _lookup(entry, array_element_id):
+        current, index, indexed = entry
+        last = len(current) - 1
+        if indexed < last:
+            for item in islice(current, indexed, last):
+                if isinstance(item, dict):
+                    index.setdefault(item.get("id"), item)
+            entry[2] = last
+        return index.get(array_element_id)
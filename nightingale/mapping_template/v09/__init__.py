@@ -1,8 +1,8 @@
 import logging
+from collections import defaultdict
 
-import openpyxl
-
-from nightingale.util import get_longest_array_path
+from nightingale.cache import load_cached
+from nightingale.workbook import iter_rows, open_workbook
 
 logger = logging.getLogger(__name__)
 
@@ -23,14 +23,66 @@ SCHEMA_SHEET = "Schema"
 
 
 class MappingTemplate:
-    def __init__(self, config):
+    def __init__(self, config, cache_directory=None):
+        """
+        Load the mapping template.
+
+        :param config: The mapping configuration.
+        :param cache_directory: The directory of cache files, if caching (see :func:`nightingale.cache.load_cached`).
+        """
         self.config = config
-        self.wb = openpyxl.load_workbook(self.config.file, data_only=True)
-        self.data_elements = self.read_data_elements_sheet(self.wb[DATA_SHEET])
-        mappings = self.read_mappings()
-        self.mappings = self.enforce_mapping_structure(mappings)
-        self.schema = self.read_schema_sheet()
-        self.extensions = self.read_extenions_info()
+        self.wb = None
+        data = load_cached(config.file, cache_directory, "mapping", self.read_workbook)
+        self.data_elements = data["data_elements"]
+        self.mappings = data["mappings"]
+        self.schema = data["schema"]
+        self.extensions = data["extensions"]
+        self.index_array_paths(mapping["path"] for mapping in self.mappings)
+
+    def read_workbook(self):
+        """Parse the data elements, mappings, schema and extensions, if they aren't cached."""
+        with open_workbook(self.config.file) as self.wb:
+            return {
+                "data_elements": self.read_data_elements_sheet(self.wb[DATA_SHEET]),
+                "mappings": self.enforce_mapping_structure(self.read_mappings()),
+                "schema": self.read_schema_sheet(),
+                "extensions": self.read_extenions_info(),
+            }
+
+    def __getstate__(self):
+        # The workbook isn't needed once parsed, and can't be pickled, to send the template to worker processes.
+        return {**self.__dict__, "wb": None}
+
+    @property
+    def mappings(self):
+        return self._mappings
+
+    @mappings.setter
+    def mappings(self, mappings):
+        self._mappings = mappings
+        self._mappings_by_path = defaultdict(list)
+        self._mappings_by_column = defaultdict(list)
+        for mapping in mappings:
+            self._mappings_by_path[mapping["path"]].append(mapping)
+            self._mappings_by_column[mapping["mapping"]].append(mapping)
+
+    @property
+    def schema(self):
+        return self._schema
+
+    @schema.setter
+    def schema(self, schema):
+        self._schema = schema
+        self._array_path_index = {}
+        self.index_array_paths(schema)
+
+    def index_array_paths(self, paths):
+        """Precompute the containing array path of each path, for :meth:`get_containing_array_path`."""
+        arrays = sorted(self.get_arrays(), key=len, reverse=True)
+        for path in paths:
+            if path not in self._array_path_index:
+                # The arrays are sorted longest first, so the first match is the longest.
+                self._array_path_index[path] = next((array for array in arrays if path.startswith(array)), None)
 
     def get_schema_sheet(self):
         return [self.wb[sheet] for sheet in self.wb.sheetnames if "OCDS" in sheet and SCHEMA_SHEET in sheet]
@@ -49,7 +101,7 @@ class MappingTemplate:
         current_block = ""
         mappings = []
 
-        for row in sheet.iter_rows(min_row=4, values_only=True):
+        for row in iter_rows(sheet, min_row=4, width=6):
             column_type = row[0]
             path = row[2]
             title = row[3]
@@ -96,7 +148,7 @@ class MappingTemplate:
 
     def read_data_elements_sheet(self, sheet):
         elements = {}
-        for row in sheet.iter_rows(min_row=4, values_only=True):
+        for row in iter_rows(sheet, min_row=4, width=8):
             for_mapping, data_source, table, data_element, publish, example, description, data_type, *_ = row
             if not data_element:
                 continue
@@ -116,9 +168,11 @@ class MappingTemplate:
         if EXTENSIONS_SHEET not in self.wb.sheetnames:
             return []
         sheet = self.wb[EXTENSIONS_SHEET]
-        headers = [(i, cell.value) for i, cell in enumerate(sheet[1])]  # Assuming the first row contains the headers
+        rows = iter_rows(sheet)
+        # Assuming the first row contains the headers
+        headers = list(enumerate(next(rows, ())))
         data = []
-        for row in sheet.iter_rows(min_row=2, values_only=True):
+        for row in rows:
             if not any(row):
                 continue
             row_data = {k.lower(): row[i] for i, k in headers if k}
@@ -134,7 +188,7 @@ class MappingTemplate:
             return {}
         schema = {}
         for sheet in sheets:
-            for row in sheet.iter_rows(min_row=2, values_only=True):
+            for row in iter_rows(sheet, min_row=2, width=9):
                 _, path, title, description, field_type, field_range, values, links, codelist, *_ = row
                 if not path:
                     continue
@@ -178,16 +232,15 @@ class MappingTemplate:
     def get_mapping_for(self, path):
         if not path.startswith("/"):
             path = "/" + path
-        return [mapping for mapping in self.get_mappings() if mapping["path"] == path]
+        return self._mappings_by_path.get(path, [])
 
     def get_paths_for_mapping(self, key, *, force_publish=False):
-        result = []
-        for mapping in self.get_mappings():
-            if mapping["mapping"] == key:
-                element = self.get_element_by_mapping(key)
-                if element.get("publish", False) or force_publish:
-                    result.append(mapping["path"])
-        return result
+        mappings = self._mappings_by_column.get(key)
+        if not mappings:
+            return []
+        if not force_publish and not self.get_element_by_mapping(key).get("publish", False):
+            return []
+        return [mapping["path"] for mapping in mappings]
 
     def is_array_path(self, path):
         return self.schema.get(path, {}).get("type") == "array"
@@ -207,7 +260,11 @@ class MappingTemplate:
         return ocid_mapping["mapping"]
 
     def get_containing_array_path(self, path):
-        return get_longest_array_path(self.get_arrays(), path)
+        try:
+            return self._array_path_index[path]
+        except KeyError:
+            self.index_array_paths((path,))
+            return self._array_path_index[path]
 
     def get_datetime_fields(self):
         """Return a list of paths that are marked as 'date-time' in the 'values' column in the schema."""
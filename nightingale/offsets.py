@@ -0,0 +1,76 @@
+import sqlite3
+from collections.abc import Iterator
+from pathlib import Path
+
+# The number of rows to insert at a time.
+BATCH_SIZE = 10_000
+
+
+class OffsetsWriter:
+    """
+    Records the byte offset and length of each streamed release in a SQLite database.
+
+    The database has an ``offsets`` table with ``ocid``, ``id``, ``file``, ``offset`` and ``length`` columns. The
+    ``file`` is the name of the package file, in the same directory as the database.
+
+    :param path: The path of the database. An existing database is replaced.
+    :param fsync: Whether to sync the database to disk when closed.
+    """
+
+    def __init__(self, path: Path, *, fsync: bool = False):
+        path.unlink(missing_ok=True)
+        # The background writer thread, if enabled, uses the connection, but never at the same time as another thread.
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        # SQLite syncs the database to disk when committing, unless synchronous is OFF.
+        self.connection.execute(f"PRAGMA synchronous = {'FULL' if fsync else 'OFF'}")
+        self.connection.execute("CREATE TABLE offsets (ocid TEXT, id TEXT, file TEXT, offset INTEGER, length INTEGER)")
+        self._rows = []
+
+    def add(self, ocid: str, release_id: str, file: str, offset: int, length: int) -> None:
+        """
+        Record the location of a release.
+
+        :param ocid: The release's ``ocid``.
+        :param release_id: The release's ``id``.
+        :param file: The name of the package file.
+        :param offset: The byte offset of the release in the file.
+        :param length: The byte length of the release.
+        """
+        self._rows.append((ocid, release_id, file, offset, length))
+        if len(self._rows) >= BATCH_SIZE:
+            self.flush()
+
+    def flush(self) -> None:
+        """Insert the recorded rows."""
+        self.connection.executemany("INSERT INTO offsets VALUES (?, ?, ?, ?, ?)", self._rows)
+        self._rows = []
+
+    def close(self) -> None:
+        """Insert the recorded rows, index the table by OCID, and close (and sync, if configured) the database."""
+        self.flush()
+        # Creating the index after inserting is faster than maintaining it while inserting.
+        self.connection.execute("CREATE INDEX offsets_ocid_idx ON offsets (ocid)")
+        self.connection.commit()
+        self.connection.close()
+
+
+def extract_releases(path: Path, ocid: str) -> Iterator[bytes]:
+    """
+    Read the releases with the given OCID from the package files, seeking to their recorded offsets.
+
+    :param path: The path of the database written by :class:`OffsetsWriter`.
+    :param ocid: The OCID.
+    :return: The serialized releases, in the order in which they were written.
+    """
+    connection = sqlite3.connect(f"{path.absolute().as_uri()}?mode=ro", uri=True)
+    try:
+        rows = connection.execute(
+            "SELECT file, offset, length FROM offsets WHERE ocid = ? ORDER BY rowid", (ocid,)
+        ).fetchall()
+    finally:
+        connection.close()
+
+    for file, offset, length in rows:
+        with (path.parent / file).open("rb") as f:
+            f.seek(offset)
+            yield f.read(length)
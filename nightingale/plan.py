@@ -0,0 +1,170 @@
+import copy
+import logging
+from collections import defaultdict
+from dataclasses import dataclass
+from operator import itemgetter
+from typing import Any
+
+from nightingale.util import group_contiguous_mappings, sort_group_by_parent_and_id
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, slots=True)
+class MappingStep:
+    """A mapping from a source column to an OCDS path, with its template lookups resolved."""
+
+    #: The position of the step in the plan.
+    index: int
+    #: The mapping template entry.
+    mapping: dict[str, Any]
+    #: The OCDS path, like ``/tender/items/id``.
+    path: str
+    #: The source column.
+    column: str
+    #: The components of the path, like ``("tender", "items", "id")``.
+    keys: tuple[str, ...]
+    #: The path of the longest array containing the path, if any.
+    array_path: str | None
+    #: The remainder of the path after the array path, like ``/id``.
+    child_path: str
+    #: The name of the path's codelist, if any.
+    codelist: str | None
+    #: Whether the path is a date-time field.
+    is_datetime: bool
+
+
+class MappingPlan:
+    """
+    The steps to map a row, compiled once from a mapping template.
+
+    The steps are grouped by contiguous block and sorted so that ``/id`` paths come first within each parent. Mappings
+    without a source column are omitted. The steps are also indexed by source column, so that :meth:`match` only visits
+    the columns of a row that have values.
+
+    Rows are dictionaries, unless the plan is bound to the selector's result columns with :meth:`bind`, in which case
+    rows are tuples, and values are read by position.
+
+    :param template: The mapping template.
+    """
+
+    def __init__(self, template):
+        self.template = template
+        schema = template.get_schema()
+        datetime_fields = set(template.get_datetime_fields())
+        mappings = [
+            mapping
+            for _block, group in group_contiguous_mappings(template.get_mappings())
+            for mapping in sort_group_by_parent_and_id(group)
+            if mapping["mapping"]
+        ]
+        self.set_steps([self.compile_step(i, mapping, schema, datetime_fields) for i, mapping in enumerate(mappings)])
+        # Source columns that the mapper reads while mapping other paths.
+        self.contract_id_column = self.get_column_for("/contracts/id")
+        self.milestone_id_column = self.get_column_for("/contracts/milestones/id")
+        self.milestone_code_column = self.get_column_for("/contracts/milestones/code")
+        self.milestone_type_column = self.get_column_for("/contracts/milestones/type")
+        self.milestone_status_column = self.get_column_for("/contracts/milestones/status")
+        #: The position of each column in a row, if the plan is bound.
+        self.positions: dict[str, int] | None = None
+        #: The steps for the column at each position in a row, if the plan is bound.
+        self.steps_by_position: list[tuple[MappingStep, ...]] | None = None
+
+    def compile_step(
+        self, index: int, mapping: dict[str, Any], schema: dict[str, Any], datetime_fields: set[str]
+    ) -> MappingStep:
+        path = mapping["path"]
+        array_path = self.template.get_containing_array_path(path)
+        return MappingStep(
+            index=index,
+            mapping=mapping,
+            path=path,
+            column=mapping["mapping"],
+            keys=tuple(path.strip("/").split("/")),
+            array_path=array_path,
+            child_path=path[len(array_path) :] if array_path else "",
+            codelist=schema.get(path, {}).get("codelist"),
+            is_datetime=path in datetime_fields,
+        )
+
+    def set_steps(self, steps: list[MappingStep]) -> None:
+        self.steps = steps
+        self.steps_by_column = defaultdict(list)
+        for step in steps:
+            self.steps_by_column[step.column].append(step)
+
+    def prune(self, columns: list[str]) -> "MappingPlan":
+        """
+        Return a copy of the plan without the steps whose source column isn't in the columns, and log them.
+
+        :param columns: The result columns of the selector.
+        """
+        columns = set(columns)
+        pruned = copy.copy(self)
+        pruned.set_steps([step for step in self.steps if step.column in columns])
+        if missing := [step for step in self.steps if step.column not in columns]:
+            logger.info(
+                "Pruned %d mappings whose columns aren't returned by the selector: %s",
+                len(missing),
+                ", ".join(f"{step.column} ({step.path})" for step in missing),
+            )
+        return pruned
+
+    def bind(self, columns: list[str]) -> "MappingPlan":
+        """
+        Return a copy of the plan, pruned with :meth:`prune`, that reads rows as tuples with the given columns.
+
+        :param columns: The result columns of the selector.
+        """
+        bound = self.prune(columns)
+        # If a column name is repeated, the last value is used, like with dict(sqlite3.Row).
+        bound.positions = {column: position for position, column in enumerate(columns)}
+        bound.steps_by_position = [()] * len(columns)
+        for column, steps in bound.steps_by_column.items():
+            bound.steps_by_position[bound.positions[column]] = tuple(steps)
+        return bound
+
+    def match(self, row: dict[str, Any] | tuple[Any, ...]) -> list[tuple[MappingStep, Any]]:
+        """
+        Return the steps whose source column has a truthy value in the row, with the value, in plan order.
+
+        :param row: The input row.
+        """
+        matches = []
+        if self.steps_by_position is None:
+            steps_by_column = self.steps_by_column
+            for column, value in row.items():
+                if value and (steps := steps_by_column.get(column)):
+                    matches.extend((step.index, step, value) for step in steps)
+        else:
+            steps_by_position = self.steps_by_position
+            for position, value in enumerate(row):
+                if value and (steps := steps_by_position[position]):
+                    matches.extend((step.index, step, value) for step in steps)
+        matches.sort(key=itemgetter(0))
+        return [(step, value) for _, step, value in matches]
+
+    def get_value(self, row: dict[str, Any] | tuple[Any, ...], column: str) -> Any:
+        """
+        Return the value of the column in the row, or ``None`` if the row has no such column.
+
+        :param row: The input row.
+        :param column: The column name.
+        """
+        if self.positions is None:
+            return row.get(column)
+        if (position := self.positions.get(column)) is None:
+            return None
+        return row[position]
+
+    def get_column_for(self, path: str) -> str | None:
+        """Return the source column of the first mapping for the path, or ``None`` if the path isn't mapped."""
+        if mappings := self.template.get_mapping_for(path):
+            return mappings[0]["mapping"]
+        return None
+
+    def __len__(self):
+        return len(self.steps)
+
+    def __iter__(self):
+        return iter(self.steps)
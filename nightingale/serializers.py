@@ -0,0 +1,67 @@
+from typing import Any
+
+import simplejson as json
+
+from nightingale.exceptions import MissingDependencyError
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class SimplejsonSerializer:
+    """Serialize JSON with simplejson, which writes ``Decimal`` values exactly."""
+
+    def dumps(self, obj: Any, *, indent: int | None = None) -> bytes:
+        """
+        Serialize an object to UTF-8 JSON.
+
+        :param obj: The object to serialize.
+        :param indent: The number of spaces with which to indent, or ``None`` for no whitespace.
+        """
+        separators = (",", ": ") if indent else (",", ":")
+        return json.dumps(obj, indent=indent, separators=separators, ensure_ascii=False).encode()
+
+
+class OrjsonSerializer:
+    """
+    Serialize JSON with orjson, which is much faster. orjson only supports an indentation of 2 spaces.
+
+    orjson can't write ``Decimal`` values exactly, so objects that orjson can't serialize are serialized with
+    simplejson, instead.
+    """
+
+    def dumps(self, obj: Any, *, indent: int | None = None) -> bytes:
+        """
+        Serialize an object to UTF-8 JSON.
+
+        :param obj: The object to serialize.
+        :param indent: Whether to indent (by 2 spaces, whatever the value), or ``None`` for no whitespace.
+        """
+        option = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        try:
+            return orjson.dumps(obj, option=option)
+        except orjson.JSONEncodeError:
+            return _simplejson.dumps(obj, indent=2 if indent else None)
+
+
+_simplejson = SimplejsonSerializer()
+
+
+def get_serializer(name: str) -> SimplejsonSerializer | OrjsonSerializer:
+    """
+    Return the serializer with the given name.
+
+    :param name: ``"orjson"``, ``"simplejson"``, or ``"auto"`` to use orjson if it is installed, or else simplejson.
+    :raises MissingDependencyError: if the serializer is ``"orjson"`` and orjson isn't installed
+    """
+    if name == "auto":
+        name = "simplejson" if orjson is None else "orjson"
+    if name == "orjson":
+        if orjson is None:
+            raise MissingDependencyError("orjson", "the orjson serializer")
+        return OrjsonSerializer()
+    return SimplejsonSerializer()
@@ -1,8 +1,13 @@
+import hashlib
+import json
+import logging
 from datetime import UTC, datetime
 
+logger = logging.getLogger(__name__)
 
-def produce_package_name(date) -> str:
-    return f"release-package-{date}.json"
+
+def produce_package_name(date, extension="json") -> str:
+    return f"release-package-{date}.{extension}"
 
 
 def remove_dicts_without_id(data):
@@ -22,6 +27,64 @@ def remove_dicts_without_id(data):
     return data
 
 
+def prune_dicts_without_id(data):
+    """
+    Remove the same dicts and empty values as :func:`remove_dicts_without_id`, but in place, without copying the data.
+
+    :param data: The data to prune.
+    :return: The data.
+
+    >>> data = {"awards": [{"id": "1", "title": ""}, {"title": "No ID"}], "tender": {"items": []}, "ocid": "1"}
+    >>> prune_dicts_without_id(data)
+    {'awards': [{'id': '1'}], 'ocid': '1'}
+    """
+    if isinstance(data, dict):
+        for key in list(data):
+            value = data[key]
+            if isinstance(value, dict | list):
+                prune_dicts_without_id(value)
+            if not value:
+                del data[key]
+    elif isinstance(data, list):
+        data[:] = [
+            item for item in data if not isinstance(item, dict) or "id" in item or item.get("verificationMethod")
+        ]
+        for item in data:
+            if isinstance(item, dict | list):
+                prune_dicts_without_id(item)
+    return data
+
+
+def group_rows_by_ocid(data, get_ocid):
+    """
+    Yield the OCID and the rows of each run of consecutive rows with the same OCID.
+
+    Rows without an OCID are logged and skipped.
+
+    :param data: The input rows.
+    :param get_ocid: A function that returns the OCID of a row.
+
+    >>> rows = [{"ocid": "1"}, {"ocid": "1"}, {"ocid": ""}, {"ocid": "2"}]
+    >>> list(group_rows_by_ocid(rows, lambda row: row.get("ocid")))
+    [('1', [{'ocid': '1'}, {'ocid': '1'}]), ('2', [{'ocid': '2'}])]
+    """
+    curr_ocid = None
+    rows = []
+    for row in data:
+        ocid = get_ocid(row)
+        if not ocid:
+            logger.warning("No OCID found in row: %s. Skipping.", row)
+            continue
+        if ocid != curr_ocid:
+            if rows:
+                yield curr_ocid, rows
+            curr_ocid = ocid
+            rows = []
+        rows.append(row)
+    if rows:
+        yield curr_ocid, rows
+
+
 def get_iso_now():
     return datetime.now(UTC).strftime("%Y-%m-%dT%H:%M:%SZ")
 
@@ -115,3 +178,19 @@ def sort_group_by_parent_and_id(group: list[dict]) -> list[dict]:
         sorted_subgroup = sorted(current_subgroup, key=lambda x: 0 if x["path"].endswith("/id") else 1)
         sorted_list.extend(sorted_subgroup)
     return sorted_list
+
+
+def hash_release(release: dict) -> str:
+    """
+    Return the SHA-256 hex digest of the release's canonical JSON: sorted keys, no whitespace, and UTF-8.
+
+    The standard library's json module is used, rather than orjson or simplejson, so that the digest doesn't depend
+    on which optional packages are installed.
+
+    :param release: The release.
+
+    >>> hash_release({"ocid": "1", "tag": ["tender"]}) == hash_release({"tag": ["tender"], "ocid": "1"})
+    True
+    """
+    data = json.dumps(release, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(data.encode()).hexdigest()
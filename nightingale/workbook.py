@@ -0,0 +1,40 @@
+import contextlib
+from collections.abc import Iterator
+from pathlib import Path
+
+import openpyxl
+
+
+@contextlib.contextmanager
+def open_workbook(path: Path) -> Iterator[openpyxl.Workbook]:
+    """
+    Open a workbook whose sheets are read row by row, and close it on exit.
+
+    The workbook is loaded in read-only mode, which doesn't hold every cell in memory, but which keeps the file open
+    until the workbook is closed.
+
+    :param path: The path of the workbook.
+    """
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        yield workbook
+    finally:
+        workbook.close()
+
+
+def iter_rows(sheet, min_row: int = 1, width: int = 0) -> Iterator[tuple]:
+    """
+    Yield the values of each row of the sheet, like in full mode.
+
+    In read-only mode, rows are as wide as the sheet's recorded dimensions, which can be missing or wrong. In that
+    case, rows are short or cut, and missing rows are empty. Instead, the recorded dimensions are ignored, and each
+    row is padded with ``None`` to the width of the widest row so far, or to ``width`` if wider.
+
+    :param sheet: The worksheet.
+    :param min_row: The number of the first row to yield, starting at 1.
+    :param width: The minimum number of values in each row.
+    """
+    sheet.reset_dimensions()
+    for row in sheet.iter_rows(min_row=min_row, values_only=True):
+        width = max(width, len(row))
+        yield (*row, *(None,) * (width - len(row)))
@@ -1,25 +1,70 @@
+import contextlib
+import gzip
+import io
 import os
+import queue
+import threading
+import time
 from pathlib import Path
-from typing import TYPE_CHECKING
-
-import simplejson as json
+from urllib.parse import urljoin
 
 from nightingale.config import Output
-from nightingale.exceptions import StreamNotStartedError
+from nightingale.exceptions import MissingDependencyError, StreamNotStartedError
+from nightingale.offsets import OffsetsWriter
+from nightingale.serializers import get_serializer
 from nightingale.util import get_iso_now, produce_package_name
 
-if TYPE_CHECKING:
-    import io
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+EXTENSIONS = {"gzip": ".gz", "zstd": ".zst"}
+
+# Signals the background thread to stop.
+_STOP = object()
 
 
-def new_name(package: dict | list) -> str:
+def new_name(package: dict | list, extension: str = "json") -> str:
     """
     Generate a new name for the package based on its published date.
 
     :param package: The release package dictionary.
+    :param extension: The file extension.
     :return: The generated package name.
     """
-    return produce_package_name(get_iso_now() if isinstance(package, list) else package["publishedDate"])
+    return produce_package_name(package["publishedDate"] if isinstance(package, dict) else get_iso_now(), extension)
+
+
+def with_uri(package: dict, name: str) -> dict:
+    """
+    Return the package, with its ``uri`` set to the URI of the file with the given name, if it has a ``uri``.
+
+    The package's ``uri`` is produced for a ``.json`` file, but the package can be written to a compressed file, to a
+    JSON Lines file, or to parts.
+
+    >>> with_uri({"uri": "https://example.com/release-package-2022-01-01.json"}, "release-package-2022-01-01.jsonl")
+    {'uri': 'https://example.com/release-package-2022-01-01.jsonl'}
+    """
+    if "uri" not in package:
+        return package
+    return {**package, "uri": urljoin(package["uri"], name)}
+
+
+def get_partial_path(path: Path) -> Path:
+    """Return the temporary path at which a file is written, before it is renamed to its final path."""
+    return path.with_name(f"{path.name}.partial")
+
+
+def fsync_directory(path: Path) -> None:
+    """Sync the directory to disk, so that renames are durable. Skipped on Windows, which can't open directories."""
+    if os.name == "nt":
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
 
 
 class DataWriter:
@@ -30,11 +75,41 @@ class DataWriter:
         Initialize the DataWriter.
 
         :param config: Configuration object containing settings for the writer.
+        :raises MissingDependencyError: if the serializer is ``"orjson"`` and orjson isn't installed, or if the
+            compression is ``"zstd"`` and zstandard isn't installed
         """
+        if config.compression == "zstd" and zstandard is None:
+            raise MissingDependencyError("zstandard", "zstd compression")
         self.config = config
-        self._file_handler: io.TextIOWrapper | None = None
+        self.serializer = get_serializer(config.serializer)
+        self._file_handler: io.BufferedWriter | None = None
+        # The file under the file handler, and the compressor between them, if compressing.
+        self._raw_file: io.BufferedWriter | None = None
+        self._compressor = None
+        # Whether a streaming session is started. The file handler is briefly None while rotating parts.
+        self._streaming = False
         self._is_first_release = True
         self._output_path = None
+        self._metadata_path = None
+        self._package_metadata = {}
+        # The files of a streamed package, if splitting into parts, and the releases and bytes in the current file.
+        self._parts = []
+        self._part_name = None
+        self._part_releases = 0
+        self._part_bytes = 0
+        # The database of the offsets of streamed releases, if recording offsets.
+        self._offsets: OffsetsWriter | None = None
+        # The background thread, its queue, and its error, if any.
+        self._thread: threading.Thread | None = None
+        self._queue: queue.Queue | None = None
+        self._error: BaseException | None = None
+        self._failed = False
+        # The final paths of the files being written, which are renamed from temporary paths on success.
+        self._pending: list[Path] = []
+        # Releases and bytes streamed since the last flush, and the time of the last flush.
+        self._unflushed_releases = 0
+        self._unflushed_bytes = 0
+        self._last_flush = 0.0
 
     def make_dirs(self) -> Path:
         """
@@ -55,59 +130,424 @@ class DataWriter:
         """
         if not self._output_path:
             base = self.make_dirs()
-            self._output_path = base / new_name(package)
+            name = new_name(package, "jsonl" if self.is_jsonl() else "json")
+            self._output_path = base / f"{name}{EXTENSIONS.get(self.config.compression, '')}"
+            self._metadata_path = base / new_name(package, "metadata.json")
         return self._output_path
 
+    def get_metadata_path(self, package: dict | list) -> Path:
+        """
+        Get the path of the package metadata file, for the JSON Lines format.
+
+        :param package: The release package dictionary.
+        :return: The path where the package metadata will be written.
+        """
+        self.get_output_path(package)
+        return self._metadata_path
+
     def write(self, package: dict | list) -> None:
         """
         Write the release package to disk in a single operation.
 
+        The releases are serialized one at a time, like when streaming, so that the serialized package isn't held in
+        memory.
+
         :param package: The release package dictionary or list of releases.
         """
         path = self.get_output_path(package)
-        with path.open("w", encoding="utf-8") as f:
-            json.dump(package, f, indent=2, ensure_ascii=False)
+        if isinstance(package, dict) and "releases" not in package:
+            try:
+                self._file_handler = self.open_file(self.create(path))
+                self._file_handler.write(self.serializer.dumps(with_uri(package, path.name), indent=self.indent(2)))
+                if self.is_compact():
+                    self._file_handler.write(b"\n")
+                self.close_file()
+            except BaseException:
+                self.abort_package_stream()
+                raise
+            self.commit()
+            return
 
-    def start_package_stream(self, package_metadata: dict) -> None:
-        """Start a streaming write session, write package metadata and prepare for releases."""
-        buffer_size_str = os.getenv("APP_WRITE_BUFFER_SIZE", "8388608")
-        buffer_size = int(buffer_size_str)
-        path = self.get_output_path(package_metadata)
-        self._file_handler = path.open("w", encoding="utf-8", buffering=buffer_size)
+        try:
+            if isinstance(package, dict):
+                self.start_package_stream({key: value for key, value in package.items() if key != "releases"})
+                releases = package["releases"]
+            else:
+                self.start_package_stream(None)
+                releases = package
+            for release in releases:
+                self.stream_release(release)
+        except BaseException:
+            self.abort_package_stream()
+            raise
+        self.end_package_stream()
 
-        # Write metadata part of the package
-        metadata_items = []
-        for key, value in package_metadata.items():
-            metadata_items.append(f'"{key}": {json.dumps(value, ensure_ascii=False, indent=2)}')
+    def write_metadata(self, package_metadata: dict) -> None:
+        """
+        Write the package metadata to its own file, for the JSON Lines format.
+
+        The ``uri`` is set to the URI of the JSON Lines file or, if splitting into parts, of the index file.
+
+        :param package_metadata: The release package dictionary, without releases.
+        """
+        path = self.get_index_path() if self.is_rotating() else self.get_output_path(package_metadata)
+        data = self.serializer.dumps(with_uri(package_metadata, path.name), indent=2)
+        self.write_file(self.get_metadata_path(package_metadata), data)
+
+    def write_file(self, path: Path, data: bytes) -> None:
+        """
+        Write a small file at its temporary path, and sync it to disk, if configured.
+
+        :param path: The final path of the file.
+        :param data: The contents of the file.
+        """
+        with self.create(path).open("wb") as f:
+            f.write(data)
+            if self.config.fsync:
+                f.flush()
+                os.fsync(f.fileno())
+
+    def create(self, path: Path) -> Path:
+        """
+        Return the temporary path at which to write a file, until the output is committed with :meth:`commit`.
+
+        :param path: The final path of the file.
+        :return: The path, like ``release-package-<date>.json.partial``.
+        """
+        self._pending.append(path)
+        return get_partial_path(path)
+
+    def commit(self) -> None:
+        """
+        Rename the files that were written to their final paths, and sync the directory to disk, if configured.
+
+        The files themselves are synced to disk when closed, if configured.
+        """
+        for path in self._pending:
+            get_partial_path(path).replace(path)
+        if self.config.fsync and self._pending:
+            fsync_directory(self._pending[0].parent)
+        self._pending = []
+
+    def discard(self) -> None:
+        """Delete the files that were written, without renaming them to their final paths."""
+        for path in self._pending:
+            get_partial_path(path).unlink(missing_ok=True)
+        self._pending = []
+
+    def open_file(self, path: Path) -> io.BufferedWriter:
+        """
+        Open the file for writing, compressing if configured. Close it with :meth:`close_file`.
+
+        :param path: The path of the file.
+        """
+        config = self.config
+        if config.compression is None:
+            self._raw_file = path.open("wb", buffering=config.buffer_size)
+            return self._raw_file
+
+        # The compressor doesn't close the file, so that the file can be synced to disk after the compressor is closed.
+        self._raw_file = path.open("wb")
+        if config.compression == "gzip":
+            level = 6 if config.compression_level is None else config.compression_level
+            self._compressor = gzip.GzipFile(fileobj=self._raw_file, mode="wb", compresslevel=level)
+        else:
+            level = 3 if config.compression_level is None else config.compression_level
+            compressor = zstandard.ZstdCompressor(level=level, threads=config.compression_threads)
+            self._compressor = compressor.stream_writer(self._raw_file, closefd=False)
+        # Compress in large chunks, rather than per write.
+        return io.BufferedWriter(self._compressor, buffer_size=config.buffer_size)
+
+    def close_file(self) -> None:
+        """Close the file that was opened with :meth:`open_file`, after syncing it to disk, if configured."""
+        if self._compressor:
+            # Write the end of the compressed stream.
+            self._file_handler.close()
+        if self.config.fsync:
+            self._raw_file.flush()
+            os.fsync(self._raw_file.fileno())
+        self._raw_file.close()
+        self._file_handler = None
+        self._raw_file = None
+        self._compressor = None
+
+    def is_compact(self) -> bool:
+        """Return whether to write JSON without whitespace."""
+        return self.config.format != "pretty"
+
+    def is_jsonl(self) -> bool:
+        """Return whether to write one release per line."""
+        return self.config.format == "jsonl"
 
-        self._file_handler.write("{\n  " + ",\n  ".join(metadata_items) + ",\n")
-        self._file_handler.write('  "releases": [\n')
+    def indent(self, indent: int) -> int | None:
+        """Return the indentation to use, given the indentation for the pretty format."""
+        return None if self.is_compact() else indent
+
+    def is_rotating(self) -> bool:
+        """Return whether to split a streamed package into parts."""
+        return self.config.max_releases is not None or self.config.max_bytes is not None
+
+    def get_extension(self) -> str:
+        """Return the extension of the output files, like ``.json.gz``."""
+        return f"{'.jsonl' if self.is_jsonl() else '.json'}{EXTENSIONS.get(self.config.compression, '')}"
+
+    def get_part_path(self, number: int) -> Path:
+        """
+        Get the path of a part of a streamed package, if splitting into parts.
+
+        :param number: The part number, starting at 1.
+        :return: The path, like ``release-package-<date>.00001.json``.
+        """
+        return self._output_path.with_name(f"{self.get_stem()}.{number:05d}{self.get_extension()}")
+
+    def get_index_path(self) -> Path:
+        """
+        Get the path of the file listing the parts of a streamed package, if splitting into parts.
+
+        :return: The path, like ``release-package-<date>.index.json``.
+        """
+        return self._output_path.with_name(f"{self.get_stem()}.index.json")
+
+    def get_offsets_path(self) -> Path:
+        """
+        Get the path of the database of the offsets of streamed releases, if recording offsets.
+
+        :return: The path, like ``release-package-<date>.offsets.sqlite``.
+        """
+        return self._output_path.with_name(f"{self.get_stem()}.offsets.sqlite")
+
+    def get_stem(self) -> str:
+        """Return the name of the output file without its extension, like ``release-package-<date>``."""
+        return self._output_path.name.removesuffix(self.get_extension())
+
+    def start_package_stream(self, package_metadata: dict | None) -> None:
+        """
+        Start a streaming write session, write package metadata and prepare for releases.
+
+        :param package_metadata: The release package dictionary, without releases, or ``None`` to write an array of
+            releases, rather than a package.
+        """
+        self.get_output_path(package_metadata)
+        self._package_metadata = package_metadata
+        self._parts = []
+        self._error = None
+        self._failed = False
+        self._unflushed_releases = 0
+        self._unflushed_bytes = 0
+        self._last_flush = time.monotonic()
+
+        try:
+            if self.is_jsonl() and package_metadata is not None:
+                self.write_metadata(package_metadata)
+            if self.config.offsets:
+                self._offsets = OffsetsWriter(self.create(self.get_offsets_path()), fsync=self.config.fsync)
+            self.start_part()
+        except BaseException:
+            # The session isn't started, so callers won't abort it.
+            self.abort_package_stream()
+            raise
+        self._streaming = True
+
+        if self.config.writer_thread:
+            self._queue = queue.Queue(maxsize=self.config.writer_queue_size)
+            self._thread = threading.Thread(target=self.consume, name="nightingale-writer", daemon=True)
+            self._thread.start()
+
+    def consume(self) -> None:
+        """Write the releases in the queue, until stopped. Run by the background thread."""
+        while (release := self._queue.get()) is not _STOP:
+            # After an error, keep emptying the queue, so that stream_release doesn't block.
+            if not self._failed:
+                try:
+                    self.write_release(release)
+                except BaseException as e:  # noqa: BLE001
+                    self._error = e
+                    self._failed = True
+
+    def start_part(self) -> None:
+        """Open the next file of the streamed package, and write the package metadata, with the file's ``uri``."""
+        if self.is_rotating():
+            path = self.get_part_path(len(self._parts) + 1)
+            self._parts.append({"path": path.name, "releases": 0})
+        else:
+            path = self._output_path
+        self._file_handler = self.open_file(self.create(path))
+        self._part_name = path.name
         self._is_first_release = True
+        self._part_releases = 0
+        self._part_bytes = 0
+
+        if self.is_jsonl():
+            return
+        if self._package_metadata is None:
+            header = b"[" if self.is_compact() else b"[\n"
+            self._file_handler.write(header)
+            self._part_bytes += len(header)
+            return
+
+        # Write metadata part of the package
+        key_separator = b":" if self.is_compact() else b": "
+        items = [
+            self.serializer.dumps(key) + key_separator + self.serializer.dumps(value, indent=self.indent(2))
+            for key, value in with_uri(self._package_metadata, path.name).items()
+        ]
+        items.append(b'"releases"' + key_separator + b"[")
+
+        header = b"{" + b",".join(items) if self.is_compact() else b"{\n  " + b",\n  ".join(items) + b"\n"
+        self._file_handler.write(header)
+        self._part_bytes += len(header)
+
+    def end_part(self) -> None:
+        """Close the JSON array and the file of the streamed package."""
+        if self.is_jsonl():
+            footer = b""
+        elif self._package_metadata is None:
+            footer = b"]\n" if self.is_compact() else b"\n]\n"
+        else:
+            footer = b"]}\n" if self.is_compact() else b"\n  ]\n}\n"
+        self._file_handler.write(footer)
+        self.close_file()
+        if self.is_rotating():
+            self._parts[-1]["releases"] = self._part_releases
+
+    def is_part_full(self) -> bool:
+        """Return whether the current file of the streamed package has reached its maximum size."""
+        config = self.config
+        return self._part_releases > 0 and (
+            (config.max_releases is not None and self._part_releases >= config.max_releases)
+            or (config.max_bytes is not None and self._part_bytes >= config.max_bytes)
+        )
 
     def stream_release(self, release: dict) -> None:
-        """Write a single release to the open package file stream."""
-        if not self._file_handler:
+        """
+        Write a single release to the open package file stream.
+
+        If the background thread is enabled, add the release to its queue, waiting if the queue is full.
+
+        :raises StreamNotStartedError: if the stream isn't started
+        :raises Exception: the error of the background thread, if it failed
+        """
+        if not self._streaming:
             raise StreamNotStartedError
 
-        if not self._is_first_release:
-            self._file_handler.write(",\n")
+        if self._thread:
+            self.raise_error()
+            self._queue.put(release)
+        else:
+            self.write_release(release)
+
+    def write_release(self, release: dict) -> None:
+        """Serialize and write a single release to the open package file stream."""
+        if self.is_part_full():
+            self.end_part()
+            self.start_part()
+
+        encoded = self.serializer.dumps(release, indent=self.indent(4))
+        if self.is_jsonl():
+            separator, terminator = b"", b"\n"
+        elif self._is_first_release:
+            separator, terminator = b"", b""
+        else:
+            separator, terminator = b"," if self.is_compact() else b",\n", b""
+        data = separator + encoded + terminator
 
-        # Using simplejson for potential performance gains and better decimal handling
-        json.dump(release, self._file_handler, indent=4, ensure_ascii=False)
+        if self._offsets:
+            offset = self._part_bytes + len(separator)
+            self._offsets.add(release.get("ocid"), release.get("id"), self._part_name, offset, len(encoded))
+
+        self._file_handler.write(data)
         self._is_first_release = False
+        self._part_releases += 1
+        self._part_bytes += len(data)
+        self._unflushed_releases += 1
+        self._unflushed_bytes += len(data)
+        if self.should_flush():
+            self.flush()
+
+    def should_flush(self) -> bool:
+        """Return whether the flush policy requires the streamed releases to be flushed."""
+        config = self.config
+        return (
+            (config.flush_releases is not None and self._unflushed_releases >= config.flush_releases)
+            or (config.flush_bytes is not None and self._unflushed_bytes >= config.flush_bytes)
+            or (config.flush_seconds is not None and time.monotonic() - self._last_flush >= config.flush_seconds)
+        )
+
+    def flush(self) -> None:
+        """Flush the streamed releases to disk, and sync the file to disk, if configured."""
         self._file_handler.flush()
+        # Flushing the file handler only writes to the compressor, which buffers compressed data until it's flushed.
+        if self._compressor:
+            if isinstance(self._compressor, gzip.GzipFile):
+                self._compressor.flush()
+            else:
+                self._compressor.flush(zstandard.FLUSH_BLOCK)
+            self._raw_file.flush()
+        if self.config.fsync:
+            os.fsync(self._raw_file.fileno())
+        self._unflushed_releases = 0
+        self._unflushed_bytes = 0
+        self._last_flush = time.monotonic()
 
     def end_package_stream(self) -> None:
         """
         Finalize the streaming write session by closing the JSON array and file.
 
-        This method is safe to call even if the stream was not started or already closed.
+        The files that were written are then renamed from their temporary paths to their final paths. This method is
+        safe to call even if the stream was not started or already closed.
+
+        :raises Exception: the error of the background thread, if it failed and the error wasn't already raised
         """
+        self.stop_thread()
+        if self._failed:
+            self.abort_package_stream()
+            self.raise_error()
+            return
         if self._file_handler:
-            self._file_handler.write("\n  ]\n}\n")
-            self._file_handler.close()
-            self._file_handler = None
+            self.end_part()
+            if self.is_rotating():
+                self.write_file(self.get_index_path(), self.serializer.dumps({"parts": self._parts}, indent=2))
+        if self._offsets:
+            self._offsets.close()
+            self._offsets = None
+        self.commit()
+        self._streaming = False
+
+    def abort_package_stream(self) -> None:
+        """
+        Abandon the streaming write session, by closing and deleting the files that were written.
+
+        Unlike :meth:`end_package_stream`, no file is written to its final path, so that partial output is never
+        mistaken for a complete package. This method is safe to call even if the stream was not started or already
+        closed.
+        """
+        self.stop_thread()
+        for file in (self._file_handler, self._raw_file):
+            if file:
+                with contextlib.suppress(OSError):
+                    file.close()
+        self._file_handler = None
+        self._raw_file = None
+        self._compressor = None
+        if self._offsets:
+            self._offsets.connection.close()
+            self._offsets = None
+        self.discard()
+        self._streaming = False
+
+    def stop_thread(self) -> None:
+        """Wait for the background thread, if any, to write the releases in its queue, and stop it."""
+        if self._thread:
+            self._queue.put(_STOP)
+            self._thread.join()
+            self._thread = None
+
+    def raise_error(self) -> None:
+        """Raise the error of the background thread, if it failed and the error wasn't already raised."""
+        if self._error:
+            error, self._error = self._error, None
+            raise error
 
     def is_streaming(self) -> bool:
         """Check if the writer is currently in a streaming session."""
-        return self._file_handler is not None and not self._file_handler.closed
+        return self._streaming
@@ -1,12 +1,21 @@
 import logging
+import re
+import subprocess
+import sys
 import tempfile
 import unittest
 from pathlib import Path
 from unittest.mock import MagicMock, patch
 
+import simplejson as json
 from click.testing import CliRunner
 
 from nightingale.__main__ import main, setup_logging
+from nightingale.config import Output
+from nightingale.writer import DataWriter
+
+# The maximum cumulative import time of nightingale.__main__, in microseconds.
+IMPORT_TIME_BUDGET = 200_000
 
 
 class TestCli(unittest.TestCase):
@@ -50,11 +59,11 @@ class TestCli(unittest.TestCase):
     def tearDown(self):
         self.temp_dir.cleanup()
 
-    @patch("nightingale.__main__.Config.from_file")
-    @patch("nightingale.__main__.OCDSDataMapper")
-    @patch("nightingale.__main__.DataLoader")
-    @patch("nightingale.__main__.DataWriter")
-    @patch("nightingale.__main__.DataPublisher")
+    @patch("nightingale.config.Config.from_file")
+    @patch("nightingale.mapper.OCDSDataMapper")
+    @patch("nightingale.loader.DataLoader")
+    @patch("nightingale.writer.DataWriter")
+    @patch("nightingale.publisher.DataPublisher")
     def test_main_without_package(self, mock_publisher, mock_writer, mock_loader, mock_mapper, mock_config):
         # Setup mocks
         mock_config.return_value = MagicMock()
@@ -78,11 +87,11 @@ class TestCli(unittest.TestCase):
         mock_writer_instance.write.assert_called_once_with([{"dummy_data": "data"}])
         mock_publisher.assert_not_called()
 
-    @patch("nightingale.__main__.Config.from_file")
-    @patch("nightingale.__main__.OCDSDataMapper")
-    @patch("nightingale.__main__.DataLoader")
-    @patch("nightingale.__main__.DataWriter")
-    @patch("nightingale.__main__.DataPublisher")
+    @patch("nightingale.config.Config.from_file")
+    @patch("nightingale.mapper.OCDSDataMapper")
+    @patch("nightingale.loader.DataLoader")
+    @patch("nightingale.writer.DataWriter")
+    @patch("nightingale.publisher.DataPublisher")
     def test_main_with_package(self, mock_publisher, mock_writer, mock_loader, mock_mapper, mock_config):
         # Setup mocks
         mock_config.return_value = MagicMock()
@@ -112,11 +121,11 @@ class TestCli(unittest.TestCase):
         mock_publisher.assert_called_once()
         mock_writer_instance.write.assert_called_once_with({"packaged_data": "data"})
 
-    @patch("nightingale.__main__.Config.from_file")
-    @patch("nightingale.__main__.OCDSDataMapper")
-    @patch("nightingale.__main__.DataLoader")
-    @patch("nightingale.__main__.DataWriter")
-    @patch("nightingale.__main__.DataPublisher")
+    @patch("nightingale.config.Config.from_file")
+    @patch("nightingale.mapper.OCDSDataMapper")
+    @patch("nightingale.loader.DataLoader")
+    @patch("nightingale.writer.DataWriter")
+    @patch("nightingale.publisher.DataPublisher")
     def test_main_with_stream(self, mock_publisher, mock_writer, mock_loader, mock_mapper, mock_config):
         # Setup mocks
         mock_config.return_value = MagicMock()
@@ -153,10 +162,10 @@ class TestCli(unittest.TestCase):
 
         assert "This is a debug message" in log.output[0]
 
-    @patch("nightingale.__main__.Config.from_file")
-    @patch("nightingale.__main__.OCDSDataMapper")
-    @patch("nightingale.__main__.DataLoader")
-    @patch("nightingale.__main__.DataWriter")
+    @patch("nightingale.config.Config.from_file")
+    @patch("nightingale.mapper.OCDSDataMapper")
+    @patch("nightingale.loader.DataLoader")
+    @patch("nightingale.writer.DataWriter")
     def test_main_mapping_crash(self, mock_writer, mock_loader, mock_mapper, mock_config):
         # Setup mocks
         mock_config.return_value = MagicMock()
@@ -177,16 +186,18 @@ class TestCli(unittest.TestCase):
         assert "Error during transformation: Simulated mapping crash" in result.output
         mock_mapper.assert_called_once()
         mock_loader.assert_called_once()
+        mock_writer_instance.end_package_stream.assert_not_called()
+        mock_writer_instance.abort_package_stream.assert_called_once()
 
     def test_invalid_toml_file(self):
         result = self.runner.invoke(main, ["--config", str(self.invalid_config_path), "--loglevel", "INFO"])
         assert result.exit_code != 0
         assert "Error decoding TOML" in result.output
 
-    @patch("nightingale.__main__.Config.from_file")
-    @patch("nightingale.__main__.OCDSDataMapper")
-    @patch("nightingale.__main__.DataLoader")
-    @patch("nightingale.__main__.DataWriter")
+    @patch("nightingale.config.Config.from_file")
+    @patch("nightingale.mapper.OCDSDataMapper")
+    @patch("nightingale.loader.DataLoader")
+    @patch("nightingale.writer.DataWriter")
     def test_main_with_selector_file(self, mock_writer, mock_loader, mock_mapper, mock_config):
         # Setup mocks
         mock_config.return_value = MagicMock()
@@ -220,6 +231,44 @@ class TestCli(unittest.TestCase):
         mock_writer.assert_called_once()
         mock_writer_instance.write.assert_called_once_with([{"dummy_data": "data"}])
 
+    def test_main_without_config(self):
+        result = self.runner.invoke(main, ["--loglevel", "INFO"])
+        assert result.exit_code != 0
+        assert "Missing option '--config'." in result.output
+
+    def test_extract(self):
+        writer = DataWriter(Output(directory=self.temp_dir.name, offsets=True))
+        writer.start_package_stream({"publishedDate": "2022-01-01"})
+        writer.stream_release({"ocid": "ocds-1", "id": "1"})
+        writer.stream_release({"ocid": "ocds-2", "id": "2"})
+        writer.end_package_stream()
+        offsets_path = str(writer.get_offsets_path())
+
+        result = self.runner.invoke(main, ["extract", offsets_path, "ocds-2"])
+        assert result.exit_code == 0
+        assert json.loads(result.output) == {"ocid": "ocds-2", "id": "2"}
+
+        result = self.runner.invoke(main, ["extract", offsets_path, "ocds-3"])
+        assert result.exit_code != 0
+        assert "No releases found for ocds-3." in result.output
+
+    def test_import_time(self):
+        # Running the CLI shouldn't import heavy dependencies until they're needed.
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import nightingale.__main__"],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        imported = {}
+        for line in result.stderr.splitlines()[1:]:
+            _, _, cumulative, name = re.split(r"\s*[:|]\s*", line, maxsplit=3)
+            imported[name.strip()] = int(cumulative)
+
+        for name in ("nightingale.mapper", "nightingale.writer", "ocdskit", "openpyxl", "pydantic", "simplejson"):
+            assert name not in imported
+        assert imported["nightingale.__main__"] < IMPORT_TIME_BUDGET
+
 
 if __name__ == "__main__":
     unittest.main()
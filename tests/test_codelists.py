@@ -1,3 +1,6 @@
+import re
+import zipfile
+
 import openpyxl
 import pytest
 
@@ -10,6 +13,9 @@ class DummySheet:
         self.title = title
         self._rows = rows
 
+    def reset_dimensions(self):
+        pass
+
     def iter_rows(self, **_):
         return iter(self._rows)
 
@@ -18,6 +24,18 @@ class DummyWorkbook:
     def __init__(self, sheets):
         self.worksheets = sheets
 
+    def close(self):
+        pass
+
+
+def replace_dimensions(path, dimension):
+    """Replace the recorded dimensions of the workbook's sheets, which some applications omit or get wrong."""
+    with zipfile.ZipFile(path) as zf:
+        files = {name: zf.read(name) for name in zf.namelist()}
+    with zipfile.ZipFile(path, "w") as zf:
+        for name, data in files.items():
+            zf.writestr(name, re.sub(rb"<dimension [^>]*/>", dimension, data) if "worksheets/" in name else data)
+
 
 # Dummy config to pass to CodelistsMapping
 class DummyConfig:
@@ -103,5 +121,60 @@ def test_get_mapping_for_codelist(dummy_config, monkeypatch):
     assert mapping == {"ABC": "1"}
 
 
+def test_cache_directory(dummy_config, monkeypatch, tmp_path):
+    rows = [
+        ("codelist_name", "codelist: TestCodelist", None, None),
+        ("codelist_headers", "Code", "Source codelist", "Source code"),
+        ("1", "1", "TestSource", "ABC"),
+    ]
+    calls = []
+
+    def load_workbook(*_, **__):
+        calls.append(1)
+        return DummyWorkbook([DummySheet("(OCDS) Test", rows)])
+
+    monkeypatch.setattr(openpyxl, "load_workbook", load_workbook)
+    dummy_config.codelists = tmp_path / "codelists.xlsx"
+    dummy_config.codelists.write_bytes(b"v1")
+
+    for _ in range(2):
+        cm = CodelistsMapping(dummy_config, tmp_path / "cache")
+        assert cm.get_mapping_for_codelist("TestCodelist") == {"ABC": "1"}
+    assert len(calls) == 1
+
+    # A change to the workbook invalidates the cache.
+    dummy_config.codelists.write_bytes(b"v2")
+    CodelistsMapping(dummy_config, tmp_path / "cache")
+    assert len(calls) == 2
+
+    # An unreadable cache file is ignored.
+    for path in (tmp_path / "cache").iterdir():
+        path.write_bytes(b"invalid")
+    cm = CodelistsMapping(dummy_config, tmp_path / "cache")
+    assert cm.get_mapping_for_codelist("TestCodelist") == {"ABC": "1"}
+    assert len(calls) == 3
+
+
+@pytest.mark.parametrize("dimension", [b"", b'<dimension ref="A1" />'])
+def test_read_workbook_unsized(tmp_path, dimension):
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.title = "(OCDS) Tender status"
+    sheet.append(["Documentation"])
+    sheet.append([])
+    sheet.append(["codelist_name", "codelist: tenderStatus"])
+    sheet.append(["codelist_headers", "Code", "Source codelist", "Source code"])
+    sheet.append(["A", "active", "Status", "A"])
+    sheet.append(["B"])
+    path = tmp_path / "codelists.xlsx"
+    workbook.save(path)
+    replace_dimensions(path, dimension)
+
+    config = DummyConfig()
+    config.codelists = path
+
+    assert CodelistsMapping(config).codelists == {"tenderStatus": {"A": "active"}}
+
+
 if __name__ == "__main__":
     pytest.main()
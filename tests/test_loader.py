@@ -1,5 +1,9 @@
 import sqlite3
+import tempfile
 import unittest
+from pathlib import Path
+
+import pytest
 
 from nightingale.config import Datasource
 from nightingale.loader import DataLoader
@@ -36,6 +40,47 @@ class TestDataLoader(unittest.TestCase):
         data = self.loader.load("SELECT * FROM test_table")
         assert list(data) == [{"column1": "value1"}]
 
+    def test_select(self):
+        columns, data = self.loader.select("SELECT column1, 'value2' AS column2 FROM test_table")
+        assert columns == ["column1", "column2"]
+        assert list(data) == [("value1", "value2")]
+
+    def test_select_batches(self):
+        self.cursor.executemany("INSERT INTO test_table (column1) VALUES (?)", [("value2",), ("value3",)])
+        loader = DataLoader(Datasource(connection=":memory:", arraysize=2), connection=self.connection)
+
+        columns, batches = loader.select_batches("SELECT * FROM test_table")
+
+        assert columns == ["column1"]
+        assert list(batches) == [[("value1",), ("value2",)], [("value3",)]]
+
+    def test_get_connection_options(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "test database.db"
+            with sqlite3.connect(path) as connection:
+                connection.execute("CREATE TABLE test_table (column1 TEXT)")
+            connection.close()
+
+            config = Datasource(
+                connection=str(path),
+                read_only=True,
+                immutable=True,
+                mmap_size=1048576,
+                cache_size=-2000,
+                temp_store="MEMORY",
+                query_only=True,
+            )
+            loader = DataLoader(config)
+            connection = loader.get_connection()
+
+            assert connection.execute("PRAGMA mmap_size").fetchone()[0] == 1048576
+            assert connection.execute("PRAGMA cache_size").fetchone()[0] == -2000
+            assert connection.execute("PRAGMA temp_store").fetchone()[0] == 2  # MEMORY
+            assert connection.execute("PRAGMA query_only").fetchone()[0] == 1
+            with pytest.raises(sqlite3.OperationalError):
+                connection.execute("INSERT INTO test_table (column1) VALUES ('value1')")
+            loader.close()
+
 
 if __name__ == "__main__":
     unittest.main()
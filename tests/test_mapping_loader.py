@@ -1,10 +1,13 @@
+import pickle
 from unittest.mock import MagicMock, patch
 
 import openpyxl
 import pytest
 
-from nightingale.mapping_template.v09 import MappingTemplate
+from nightingale.config import Mapping
+from nightingale.mapping_template.v09 import MAPPINGS_SHEETS, MappingTemplate
 from nightingale.util import get_longest_array_path
+from tests.test_codelists import replace_dimensions
 
 
 def _sheets():
@@ -597,6 +600,23 @@ def test_get_paths_for_mapping(mock_load_workbook, mock_workbook, mock_config):
     assert paths == expected_paths
 
 
+@patch("openpyxl.load_workbook")
+def test_get_mapping_for(mock_load_workbook, mock_workbook, mock_config):
+    mock_workbook.__getitem__ = lambda _, x: getter(x)
+    mock_load_workbook.return_value = mock_workbook
+
+    mapping = MappingTemplate(mock_config)
+    mapping.mappings = [
+        {"path": "/ocid", "mapping": "ocid"},
+        {"path": "/parties/roles", "mapping": "buyer_role"},
+        {"path": "/parties/roles", "mapping": "supplier_role"},
+    ]
+
+    assert mapping.get_mapping_for("ocid") == [{"path": "/ocid", "mapping": "ocid"}]
+    assert [m["mapping"] for m in mapping.get_mapping_for("/parties/roles")] == ["buyer_role", "supplier_role"]
+    assert mapping.get_mapping_for("/tender/id") == []
+
+
 @patch("openpyxl.load_workbook")
 def test_is_array_path(mock_load_workbook, mock_workbook, mock_config):
     mock_workbook.__getitem__ = lambda _, x: getter(x)
@@ -608,6 +628,21 @@ def test_is_array_path(mock_load_workbook, mock_workbook, mock_config):
     assert mapping.is_array_path("/path2") is False
 
 
+@patch("openpyxl.load_workbook")
+def test_get_containing_array_path(mock_load_workbook, mock_workbook, mock_config):
+    mock_workbook.__getitem__ = lambda _, x: getter(x)
+    mock_load_workbook.return_value = mock_workbook
+
+    mapping = MappingTemplate(mock_config)
+    assert mapping.get_containing_array_path("/array_path") == "/array_path"
+    assert mapping.get_containing_array_path("/array_path/id") == "/array_path"
+    assert mapping.get_containing_array_path("/path1") is None
+
+    mapping.schema = {"/path1": {"type": "array"}}
+    assert mapping.get_containing_array_path("/array_path/id") is None
+    assert mapping.get_containing_array_path("/path1/id") == "/path1"
+
+
 def test_get_longest_array_path():
     arrays = ["/root/level1/level2", "/root/level1", "/root/level1/level2/level3"]
     path = "/root/level1/level2/element"
@@ -615,5 +650,68 @@ def test_get_longest_array_path():
     assert result == "/root/level1/level2"
 
 
+@patch("openpyxl.load_workbook")
+def test_cache_directory(mock_load_workbook, mock_workbook, tmp_path):
+    mock_workbook.__getitem__ = lambda _, x: getter(x)
+    mock_load_workbook.return_value = mock_workbook
+
+    class Config:
+        file = tmp_path / "mapping.xlsx"
+
+    Config.file.write_bytes(b"workbook")
+
+    parsed = MappingTemplate(Config, tmp_path / "cache")
+    cached = MappingTemplate(Config, tmp_path / "cache")
+
+    mock_load_workbook.assert_called_once()
+    assert cached.wb is None
+    for attr in ("data_elements", "mappings", "schema", "extensions"):
+        assert getattr(cached, attr) == getattr(parsed, attr)
+    assert cached.get_containing_array_path("/array_path/id") == "/array_path"
+
+
+@pytest.mark.parametrize("dimension", [None, b"", b'<dimension ref="A1" />'])
+def test_read_workbook(tmp_path, dimension):
+    workbook = openpyxl.Workbook()
+    workbook.remove(workbook.active)
+    sheet = workbook.create_sheet("2. Data Elements")
+    for _ in range(3):
+        sheet.append(["header"])
+    sheet.append([])
+    sheet.append(["Tender ID (tender_id)", "source", "tenders", "tender_id", "Yes", "1", "The ID", "string"])
+    for name in MAPPINGS_SHEETS:
+        sheet = workbook.create_sheet(name)
+        for _ in range(3):
+            sheet.append(["header"])
+        if name == "(OCDS) 3. Tender":
+            sheet.append(["span", None, "tender"])
+            sheet.append([])
+            sheet.append(["field", None, "tender/id", "Tender ID", "The ID", "Tender ID (tender_id)"])
+    sheet = workbook.create_sheet("OCDS Schema 1.1.5")
+    sheet.append(["header"])
+    sheet.append([])
+    sheet.append([None, "tender/id", "ID", "The ID", "string", None, None, None, None])
+    sheet = workbook.create_sheet("3. OCDS Extensions")
+    sheet.append(["Name", "URL", None])
+    sheet.append(["Lots", "https://example.com/lots/extension.json", None])
+    sheet.append([None, None, None])
+    path = tmp_path / "mapping.xlsx"
+    workbook.save(path)
+    if dimension is not None:
+        replace_dimensions(path, dimension)
+
+    mapping = MappingTemplate(Mapping(file=path, ocid_prefix="ocds-213czf", selector="SELECT 1"))
+
+    assert mapping.get_data_elements()["tender_id"]["publish"] is True
+    assert [(m["block"], m["path"], m["mapping"]) for m in mapping.get_mappings()] == [
+        ("tender", "/tender/id", "Tender ID (tender_id)")
+    ]
+    assert mapping.get_schema()["/tender/id"]["type"] == "string"
+    assert mapping.extensions == [{"name": "Lots", "url": "https://example.com/lots/extension.json"}]
+
+    # The template is sent to worker processes.
+    assert pickle.loads(pickle.dumps(mapping)).get_mappings() == mapping.get_mappings()
+
+
 if __name__ == "__main__":
     pytest.main()
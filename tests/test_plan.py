@@ -0,0 +1,107 @@
+from nightingale.plan import MappingPlan
+from tests.test_unflatten import DummyOcdsMappingTemplate
+
+
+def test_plan_groups_and_sorts():
+    template = DummyOcdsMappingTemplate(
+        [
+            {"block": "tender", "path": "/tender/title", "mapping": "TenderTitle"},
+            {"block": "tender", "path": "/tender/id", "mapping": "TenderID"},
+            {"block": "tender", "path": "/tender/items/description", "mapping": "ItemDescription"},
+            {"block": "tender", "path": "/tender/items/id", "mapping": "ItemID"},
+            {"block": "tender", "path": "/tender/status", "mapping": ""},
+            {"block": "", "path": "/language", "mapping": "Language"},
+        ],
+        {"/tender/items": {"type": "array"}, "/tender/status": {"type": "string", "codelist": "tenderStatus.csv"}},
+        ["/tender/items"],
+    )
+
+    plan = MappingPlan(template)
+
+    assert [step.path for step in plan] == [
+        "/tender/id",
+        "/tender/title",
+        "/tender/items/id",
+        "/tender/items/description",
+        "/language",
+    ]
+
+
+def test_plan_resolves_steps():
+    template = DummyOcdsMappingTemplate(
+        [{"block": "tender", "path": "/tender/items/classification/id", "mapping": "ItemCode"}],
+        {"/tender/items/classification/id": {"type": "string", "codelist": "itemScheme.csv"}},
+        ["/tender/items"],
+    )
+
+    (step,) = MappingPlan(template)
+
+    assert step.column == "ItemCode"
+    assert step.keys == ("tender", "items", "classification", "id")
+    assert step.array_path == "/tender/items"
+    assert step.child_path == "/classification/id"
+    assert step.codelist == "itemScheme.csv"
+    assert step.is_datetime is False
+
+
+def test_plan_match():
+    template = DummyOcdsMappingTemplate(
+        [
+            {"block": "parties", "path": "/parties/name", "mapping": "SupplierName"},
+            {"block": "parties", "path": "/parties/id", "mapping": "SupplierID"},
+            {"block": "awards", "path": "/awards/suppliers/name", "mapping": "SupplierName"},
+            {"block": "awards", "path": "/awards/suppliers/id", "mapping": "SupplierID"},
+            {"block": "awards", "path": "/awards/title", "mapping": "AwardTitle"},
+        ],
+        {},
+    )
+
+    plan = MappingPlan(template)
+    matches = plan.match({"SupplierName": "Acme", "AwardTitle": None, "Unmapped": "x", "SupplierID": "ACME-1"})
+
+    assert [(step.path, value) for step, value in matches] == [
+        ("/parties/id", "ACME-1"),
+        ("/parties/name", "Acme"),
+        ("/awards/suppliers/id", "ACME-1"),
+        ("/awards/suppliers/name", "Acme"),
+    ]
+
+
+def test_plan_prune(caplog):
+    template = DummyOcdsMappingTemplate(
+        [
+            {"block": "tender", "path": "/tender/id", "mapping": "TenderID"},
+            {"block": "tender", "path": "/tender/title", "mapping": "TenderTitle"},
+        ],
+        {},
+    )
+    plan = MappingPlan(template)
+
+    with caplog.at_level("INFO"):
+        pruned = plan.prune(["ocid", "TenderID"])
+
+    assert [step.path for step in pruned] == ["/tender/id"]
+    assert list(pruned.steps_by_column) == ["TenderID"]
+    assert len(plan) == 2
+    assert "Pruned 1 mappings whose columns aren't returned by the selector: TenderTitle" in caplog.text
+
+
+def test_plan_bind():
+    template = DummyOcdsMappingTemplate(
+        [
+            {"block": "contracts", "path": "/contracts/id", "mapping": "ContractID"},
+            {"block": "contracts", "path": "/contracts/title", "mapping": "ContractTitle"},
+            {"block": "contracts", "path": "/contracts/milestones/code", "mapping": "MilestoneCode"},
+        ],
+        {},
+    )
+    plan = MappingPlan(template).bind(["ContractTitle", "ocid", "ContractID"])
+    row = ("Title", "1", "C1")
+
+    assert [(step.path, value) for step, value in plan.match(row)] == [
+        ("/contracts/id", "C1"),
+        ("/contracts/title", "Title"),
+    ]
+    assert plan.get_value(row, "ocid") == "1"
+    assert plan.get_value(row, plan.contract_id_column) == "C1"
+    assert plan.get_value(row, plan.milestone_code_column) is None
@@ -1,3 +1,5 @@
+import dataclasses
+import sqlite3
 from pathlib import Path
 from unittest import mock
 
@@ -5,15 +7,17 @@ import dict_hash
 import pytest
 
 from nightingale.config import Config, Datasource, Mapping, Output, Publishing
-from nightingale.mapper import OCDSDataMapper
-from nightingale.util import get_longest_array_path
+from nightingale.loader import DataLoader
+from nightingale.mapper import ArrayIdIndex, OCDSDataMapper, find_array_element_by_id
+from nightingale.util import get_longest_array_path, hash_release, prune_dicts_without_id, remove_dicts_without_id
 
 
 class DummyOcdsMappingTemplate:
-    def __init__(self, mapping_items, schema, array_paths=None):
+    def __init__(self, mapping_items, schema, array_paths=None, datetime_fields=None):
         self.mappings = mapping_items
         self._schema = schema
         self.array_paths = array_paths or []
+        self.datetime_fields = datetime_fields or set()
 
     def get_schema(self):
         return self._schema
@@ -28,7 +32,7 @@ class DummyOcdsMappingTemplate:
         return get_longest_array_path(self.array_paths, path)
 
     def get_datetime_fields(self):
-        return set()
+        return self.datetime_fields
 
     def get_mapping_for(self, path):
         if not path.startswith("/"):
@@ -352,6 +356,137 @@ def test_transform_data_arrays(rows, mapping_items, schema_def, array_paths, exp
     assert result == expected_output
 
 
+def test_transform_row_split_milestone_codes(base_config):
+    mapping_items = [
+        {"block": "contracts", "path": "/contracts/id", "mapping": "ContractID"},
+        {"block": "contracts", "path": "/contracts/milestones/id", "mapping": "MilestoneID"},
+        {"block": "contracts", "path": "/contracts/milestones/code", "mapping": "MilestoneCode"},
+        {"block": "contracts", "path": "/contracts/milestones/status", "mapping": "MilestoneStatus"},
+    ]
+    schema_def = {"/contracts": {"type": "array"}, "/contracts/milestones": {"type": "array"}}
+    dummy_template = DummyOcdsMappingTemplate(mapping_items, schema_def, ["/contracts", "/contracts/milestones"])
+    config = Config(
+        datasource=base_config.datasource,
+        mapping=Mapping(
+            file=Path("/dummy/path.xlsx"), selector="OCDS_Selector", ocid_prefix="prefix", split_milestone_codes=True
+        ),
+        publishing=base_config.publishing,
+        output=base_config.output,
+    )
+    with mock.patch("nightingale.mapper.MappingTemplate", return_value=dummy_template):
+        mapper = OCDSDataMapper(config)
+    mapper.milestone_lookup = {"CA": {"code": "CA", "title": "Contract awarded", "description": None}}
+
+    row = {"ContractID": "C1", "MilestoneID": "M", "MilestoneCode": "CA AT", "MilestoneStatus": "met", "ocid": "1"}
+    result = mapper.transform_row(row, dummy_template, schema_def, result={}, array_counters={})
+
+    assert result == {
+        "contracts": [
+            {
+                "id": "C1",
+                "milestones": [
+                    {"id": "M-CA", "title": "Contract awarded", "code": "CA", "status": "met"},
+                    {"id": "M-AT", "code": "AT", "status": "met"},
+                ],
+            }
+        ]
+    }
+
+
+def test_array_id_index():
+    index = ArrayIdIndex()
+    array = []
+    assert index.find(array, "1") is None
+
+    array.append({})
+    assert index.find(array, "1") is array[0]
+
+    array[0]["id"] = "1"
+    array.append({"id": "2"})
+    array.append({"id": "1"})
+    array.append({})
+    for element_id in ("1", "2", "3", None):
+        assert index.find(array, element_id) is find_array_element_by_id(array, element_id)
+
+    array[-1]["id"] = "3"
+    array.append({"id": "4"})
+    for element_id in ("1", "2", "3", "4", "5"):
+        assert index.find(array, element_id) is find_array_element_by_id(array, element_id)
+
+
+def test_transform_data_parallel(base_config):
+    mapping_items = [
+        {"block": "tender", "path": "/tender/id", "mapping": "TenderID"},
+        {"block": "tender", "path": "/tender/items/id", "mapping": "ItemID"},
+        {"block": "tender", "path": "/tender/datePublished", "mapping": "Date"},
+    ]
+    schema_def = {"/tender/items": {"type": "array"}}
+    # Worker processes are spawned, so the template must be picklable, and the release dates can't be patched. The
+    # workers would fail if they loaded the mapping file, which doesn't exist.
+    dummy_template = DummyOcdsMappingTemplate(
+        mapping_items, schema_def, ["/tender/items"], datetime_fields={"/tender/datePublished"}
+    )
+    rows = [
+        {"ocid": "1", "TenderID": "T1", "ItemID": "I1", "Date": "2022-01-01T00:00:00Z"},
+        {"ocid": "1", "TenderID": "T1", "ItemID": "I2", "Date": "2022-01-02T00:00:00Z"},
+        {"ocid": "", "TenderID": "T0", "Date": "2022-01-01T00:00:00Z"},
+        {"ocid": "2", "TenderID": "T2", "ItemID": "I1", "Date": "2022-01-01T00:00:00Z"},
+        {"ocid": "3", "TenderID": "T3", "Date": "2022-01-01T00:00:00Z"},
+    ]
+
+    mapper = OCDSDataMapper(base_config, mapping=dummy_template)
+    expected = mapper.transform_data(rows, dummy_template)
+    result = mapper.transform_data_parallel(rows, dummy_template, workers=2)
+
+    assert [release["ocid"] for release in result] == ["prefix-1", "prefix-2", "prefix-3"]
+    assert result == expected
+
+
+@mock.patch("nightingale.mapper.get_iso_now", return_value="2022-01-01T00:00:00Z")
+def test_map(mock_get_iso_now, base_config):
+    mapping_items = [
+        {"block": "tender", "path": "/tender/id", "mapping": "TenderID"},
+        {"block": "tender", "path": "/tender/title", "mapping": "TenderTitle"},
+    ]
+    dummy_template = DummyOcdsMappingTemplate(mapping_items, {})
+    connection = sqlite3.connect(":memory:")
+    connection.row_factory = sqlite3.Row
+    connection.execute("CREATE TABLE tenders (ocid TEXT, TenderID TEXT)")
+    connection.execute("INSERT INTO tenders VALUES ('1', 'T1'), ('2', 'T2')")
+
+    with mock.patch("nightingale.mapper.MappingTemplate", return_value=dummy_template):
+        mapper = OCDSDataMapper(base_config)
+    mapper.config = Config(
+        datasource=base_config.datasource,
+        mapping=Mapping(file=Path("/dummy/path.xlsx"), selector="SELECT * FROM tenders", ocid_prefix="prefix"),
+        publishing=base_config.publishing,
+        output=base_config.output,
+    )
+    result = mapper.map(DataLoader(base_config.datasource, connection=connection))
+
+    assert [step.path for step in mapper.get_plan(dummy_template)] == ["/tender/id"]
+    assert [(release["ocid"], release["tender"]) for release in result] == [
+        ("prefix-1", {"id": "T1"}),
+        ("prefix-2", {"id": "T2"}),
+    ]
+
+
+def test_bind_plan(base_config):
+    mapping_items = [
+        {"block": "tender", "path": "/tender/id", "mapping": "TenderID"},
+        {"block": "tender", "path": "/tender/title", "mapping": "TenderTitle"},
+    ]
+    dummy_template = DummyOcdsMappingTemplate(mapping_items, {})
+    mapper = OCDSDataMapper(base_config, mapping=dummy_template)
+
+    mapper.bind_plan(["ocid", "TenderID"])
+    assert [step.path for step in mapper.get_plan(dummy_template)] == ["/tender/id"]
+
+    # Binding again doesn't lose the mappings that the previous selector didn't select.
+    mapper.bind_plan(["ocid", "TenderID", "TenderTitle"])
+    assert [step.path for step in mapper.get_plan(dummy_template)] == ["/tender/id", "/tender/title"]
+
+
 @pytest.mark.parametrize(
     ("input_ocid", "expected_ocid"),
     [
@@ -412,15 +547,50 @@ def test_remove_empty_id_arrays(mock_config, base_config):
     assert data == expected_output
 
 
+def test_prune_dicts_without_id():
+    data = {
+        "id": "1",
+        "empty": "",
+        "zero": 0,
+        "tender": {
+            "items": [{"id": "item1", "description": ""}, {"description": "Item without ID"}],
+            "milestones": [{"title": "No ID"}],
+            "documents": [{"id": "", "title": "Empty ID"}, "text", ["nested", {"title": "No ID"}]],
+        },
+        "contracts": [
+            {
+                "id": "1",
+                "implementation": {"transactions": [{"value": 1}]},
+                "milestones": [{"verificationMethod": {"type": "x"}, "title": "No ID"}],
+            }
+        ],
+    }
+    expected = remove_dicts_without_id(data)
+
+    assert prune_dicts_without_id(data) is data
+    assert data == expected
+    assert list(data) == list(expected)
+
+
 def generate_hash(data):
     return dict_hash.sha256(data)
 
 
+@pytest.mark.parametrize(
+    ("release_id_hash", "hash_function"),
+    [
+        ("sha256", hash_release),
+        ("dict_hash", generate_hash),
+    ],
+)
 @mock.patch("nightingale.mapper.get_iso_now")
 @mock.patch("nightingale.mapper.MappingTemplate", return_value=DummyOcdsMappingTemplate([], {}))
-def test_finish_release(mock_config, mock_get_iso_now, base_config):
+def test_finish_release(mock_config, mock_get_iso_now, base_config, release_id_hash, hash_function):
     mock_get_iso_now.return_value = "2022-01-01T00:00:00Z"
-    mapper = OCDSDataMapper(base_config)
+    config = dataclasses.replace(
+        base_config, mapping=dataclasses.replace(base_config.mapping, release_id_hash=release_id_hash)
+    )
+    mapper = OCDSDataMapper(config)
     curr_release = {"field": "value1", "tender": {"id": 1}}
     curr_ocid = "1"
     mapped = []
@@ -432,7 +602,7 @@ def test_finish_release(mock_config, mock_get_iso_now, base_config):
         "ocid": "prefix-1",
         "tag": ["tender"],
         "tender": {"id": 1},
-        "id": generate_hash(
+        "id": hash_function(
             {
                 "field": "value1",
                 "initiationType": "tender",
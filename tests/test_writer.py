@@ -1,10 +1,19 @@
+import gzip
+import os
 import unittest
+import zlib
+from decimal import Decimal
 from pathlib import Path
+from unittest.mock import patch
 
+import pytest
 import simplejson as json
+import zstandard
 
 from nightingale.config import Output
-from nightingale.writer import DataWriter
+from nightingale.exceptions import MissingDependencyError
+from nightingale.offsets import extract_releases
+from nightingale.writer import DataWriter, fsync_directory, get_partial_path
 
 
 class TestDataWriter(unittest.TestCase):
@@ -38,6 +47,362 @@ class TestDataWriter(unittest.TestCase):
             data = json.load(f)
         assert data == self.package
 
+    def test_stream(self):
+        package_metadata = {
+            "uri": "http://example.com/release-package-2022-01-01.json",
+            "publishedDate": "2022-01-01",
+            "version": "1.1",
+        }
+        releases = [
+            {"id": "1", "tag": ["tender"], "title": "Café"},
+            {"id": "2", "value": {"amount": Decimal("0.10000000000000000001")}},
+        ]
+        for serializer in ("simplejson", "orjson"):
+            for output_format in ("pretty", "compact"):
+                with self.subTest(serializer=serializer, format=output_format):
+                    config = Output(directory=self.config.directory, serializer=serializer, format=output_format)
+                    writer = DataWriter(config)
+                    writer.start_package_stream(package_metadata)
+                    for release in releases:
+                        writer.stream_release(release)
+                    writer.end_package_stream()
+
+                    with writer.get_output_path(package_metadata).open(encoding="utf-8") as f:
+                        text = f.read()
+                    assert json.loads(text, use_decimal=True) == {**package_metadata, "releases": releases}
+                    assert "0.10000000000000000001" in text
+                    assert (text.count("\n") == 1) is (output_format == "compact")
+
+    def test_stream_empty(self):
+        for output_format in ("pretty", "compact"):
+            with self.subTest(format=output_format):
+                writer = DataWriter(Output(directory=self.config.directory, format=output_format))
+                writer.get_output_path(self.package)
+                writer.start_package_stream({})
+                writer.end_package_stream()
+
+                with writer.get_output_path(self.package).open(encoding="utf-8") as f:
+                    assert json.load(f) == {"releases": []}
+
+    def test_write_compact(self):
+        writer = DataWriter(Output(directory=self.config.directory, format="compact"))
+        writer.write(self.package)
+
+        with writer.get_output_path(self.package).open(encoding="utf-8") as f:
+            assert f.read() == '{"publishedDate":"2022-01-01","data":"test_data"}\n'
+
+    def test_stream_flush(self):
+        for options, expected in (
+            ({}, 0),
+            ({"flush_releases": 1}, 5),
+            ({"flush_releases": 2}, 2),
+            ({"flush_bytes": 1}, 5),
+            ({"flush_bytes": 1_000_000}, 0),
+            ({"flush_seconds": 3600}, 0),
+        ):
+            with self.subTest(**options):
+                writer = DataWriter(Output(directory=self.config.directory, **options))
+                writer.start_package_stream(self.package)
+                with patch.object(writer._file_handler, "flush") as flush:  # noqa: SLF001
+                    for i in range(5):
+                        writer.stream_release({"id": str(i)})
+                assert flush.call_count == expected
+                writer.end_package_stream()
+
+    def test_compression(self):
+        releases = [{"id": str(i), "tag": ["tender"]} for i in range(100)]
+        package = {**self.package, "releases": releases}
+        for compression, extension, decompress in (
+            ("gzip", ".gz", gzip.decompress),
+            ("zstd", ".zst", lambda data: zstandard.ZstdDecompressor().decompressobj().decompress(data)),
+        ):
+            with self.subTest(compression=compression, method="write"):
+                writer = DataWriter(Output(directory=self.config.directory, compression=compression))
+                writer.write(package)
+
+                path = writer.get_output_path(package)
+                assert path.name == f"release-package-2022-01-01.json{extension}"
+                assert json.loads(decompress(path.read_bytes())) == package
+
+            with self.subTest(compression=compression, method="stream"):
+                writer = DataWriter(Output(directory=self.config.directory, compression=compression))
+                writer.start_package_stream(self.package)
+                for release in releases:
+                    writer.stream_release(release)
+                writer.end_package_stream()
+
+                path = writer.get_output_path(package)
+                assert json.loads(decompress(path.read_bytes())) == package
+
+    def test_stream_flush_compression(self):
+        for compression, decompressobj in (
+            ("gzip", lambda: zlib.decompressobj(wbits=31)),
+            ("zstd", lambda: zstandard.ZstdDecompressor().decompressobj()),
+        ):
+            with self.subTest(compression=compression):
+                writer = DataWriter(Output(directory=self.config.directory, compression=compression, flush_releases=1))
+                writer.start_package_stream(self.package)
+                writer.stream_release({"id": "1"})
+
+                # The compressed stream isn't finished, but the flushed release can be decompressed.
+                path = get_partial_path(writer.get_output_path(self.package))
+                assert b'"id": "1"' in decompressobj().decompress(path.read_bytes())
+
+                writer.end_package_stream()
+
+    def test_compression_missing_dependency(self):
+        with patch("nightingale.writer.zstandard", None), pytest.raises(MissingDependencyError):
+            DataWriter(Output(directory=self.config.directory, compression="zstd"))
+
+    def test_start_package_stream_error(self):
+        writer = DataWriter(Output(directory=self.config.directory, format="jsonl", offsets=True))
+        with (
+            patch.object(writer, "open_file", side_effect=OSError("disk full")),
+            pytest.raises(OSError, match="disk full"),
+        ):
+            writer.start_package_stream(self.package)
+
+        # The metadata and offsets files, which are created before the first part, are deleted.
+        assert not writer.is_streaming()
+        assert not any(Path(self.config.directory).iterdir())
+
+    def test_jsonl(self):
+        releases = [{"id": "1", "tag": ["tender"]}, {"id": "2", "tag": ["award"]}]
+
+        with self.subTest(method="write"):
+            writer = DataWriter(Output(directory=self.config.directory, format="jsonl"))
+            writer.write({**self.package, "releases": releases})
+
+            path = writer.get_output_path(self.package)
+            assert path.name == "release-package-2022-01-01.jsonl"
+            assert path.read_text() == '{"id":"1","tag":["tender"]}\n{"id":"2","tag":["award"]}\n'
+            metadata_path = writer.get_metadata_path(self.package)
+            assert metadata_path.name == "release-package-2022-01-01.metadata.json"
+            assert json.loads(metadata_path.read_text()) == self.package
+
+        with self.subTest(method="stream"):
+            writer = DataWriter(Output(directory=self.config.directory, format="jsonl"))
+            writer.start_package_stream(self.package)
+            for release in releases:
+                writer.stream_release(release)
+            writer.end_package_stream()
+
+            path = writer.get_output_path(self.package)
+            assert [json.loads(line) for line in path.read_text().splitlines()] == releases
+            assert json.loads(writer.get_metadata_path(self.package).read_text()) == self.package
+
+    def test_stream_parts(self):
+        releases = [{"id": str(i), "tag": ["tender"]} for i in range(5)]
+        for options, expected in (
+            ({"max_releases": 2}, [2, 2, 1]),
+            ({"max_releases": 5}, [5]),
+            ({"max_bytes": 1}, [1, 1, 1, 1, 1]),
+            ({"max_bytes": 1, "format": "jsonl"}, [1, 1, 1, 1, 1]),
+        ):
+            with self.subTest(**options):
+                writer = DataWriter(Output(directory=self.config.directory, **options))
+                writer.start_package_stream(self.package)
+                for release in releases:
+                    writer.stream_release(release)
+                writer.end_package_stream()
+
+                with writer.get_index_path().open() as f:
+                    parts = json.load(f)["parts"]
+                assert [part["releases"] for part in parts] == expected
+
+                extension = writer.get_extension()
+                actual = []
+                for number, part in enumerate(parts, 1):
+                    assert part["path"] == f"release-package-2022-01-01.{number:05d}{extension}"
+                    path = writer.get_part_path(number)
+                    if writer.is_jsonl():
+                        actual.extend(json.loads(line) for line in path.read_text().splitlines())
+                    else:
+                        data = json.loads(path.read_text())
+                        assert {key: value for key, value in data.items() if key != "releases"} == self.package
+                        actual.extend(data["releases"])
+                assert actual == releases
+                assert not writer.get_output_path(self.package).exists()
+
+                for file in Path(self.config.directory).iterdir():
+                    file.unlink()
+
+    def test_package_uri(self):
+        package = {"uri": "http://example.com/release-package-2022-01-01.json", "publishedDate": "2022-01-01"}
+        for options, expected in (
+            ({}, {"release-package-2022-01-01.json": "release-package-2022-01-01.json"}),
+            ({"compression": "gzip"}, {"release-package-2022-01-01.json.gz": "release-package-2022-01-01.json.gz"}),
+            (
+                {"max_releases": 1},
+                {
+                    "release-package-2022-01-01.00001.json": "release-package-2022-01-01.00001.json",
+                    "release-package-2022-01-01.00002.json": "release-package-2022-01-01.00002.json",
+                },
+            ),
+            ({"format": "jsonl"}, {"release-package-2022-01-01.metadata.json": "release-package-2022-01-01.jsonl"}),
+            (
+                {"format": "jsonl", "max_releases": 1},
+                {"release-package-2022-01-01.metadata.json": "release-package-2022-01-01.index.json"},
+            ),
+        ):
+            with self.subTest(**options):
+                writer = DataWriter(Output(directory=self.config.directory, **options))
+                writer.write({**package, "releases": [{"id": "1"}, {"id": "2"}]})
+
+                for name, uri in expected.items():
+                    path = Path(self.config.directory) / name
+                    data = gzip.decompress(path.read_bytes()) if path.suffix == ".gz" else path.read_bytes()
+                    assert json.loads(data)["uri"] == f"http://example.com/{uri}"
+
+                for file in Path(self.config.directory).iterdir():
+                    file.unlink()
+
+    def test_stream_thread(self):
+        releases = [{"id": str(i), "tag": ["tender"]} for i in range(100)]
+        writer = DataWriter(Output(directory=self.config.directory, writer_thread=True, writer_queue_size=1))
+        writer.start_package_stream(self.package)
+        for release in releases:
+            writer.stream_release(release)
+        writer.end_package_stream()
+
+        with writer.get_output_path(self.package).open() as f:
+            assert json.load(f) == {**self.package, "releases": releases}
+
+    def test_stream_thread_parts(self):
+        releases = [{"id": str(i), "tag": ["tender"]} for i in range(10)]
+        writer = DataWriter(Output(directory=self.config.directory, writer_thread=True, max_releases=1))
+        end_part = writer.end_part
+
+        # The main thread must see the session as started, while the background thread rotates parts.
+        def check_end_part():
+            end_part()
+            assert writer.is_streaming()
+
+        with patch.object(writer, "end_part", side_effect=check_end_part):
+            writer.start_package_stream(self.package)
+            for release in releases:
+                writer.stream_release(release)
+            writer.end_package_stream()
+
+        assert not writer.is_streaming()
+        with writer.get_index_path().open() as f:
+            assert [part["releases"] for part in json.load(f)["parts"]] == [1] * 10
+
+    def test_stream_thread_error(self):
+        writer = DataWriter(Output(directory=self.config.directory, writer_thread=True))
+        writer.start_package_stream(self.package)
+        writer.stream_release({"id": "1", "value": object()})
+        writer.stream_release({"id": "2"})
+
+        with pytest.raises(TypeError):
+            writer.end_package_stream()
+        assert not writer.is_streaming()
+        assert not any(Path(self.config.directory).iterdir())
+        writer.end_package_stream()
+
+    def test_stream_offsets(self):
+        releases = [{"ocid": f"ocds-1-{i % 2}", "id": str(i), "tag": ["tender"]} for i in range(5)]
+        for options in ({}, {"format": "compact"}, {"format": "jsonl"}, {"max_releases": 2}):
+            with self.subTest(**options):
+                writer = DataWriter(Output(directory=self.config.directory, offsets=True, **options))
+                writer.start_package_stream(self.package)
+                for release in releases:
+                    writer.stream_release(release)
+                writer.end_package_stream()
+
+                extracted = [json.loads(data) for data in extract_releases(writer.get_offsets_path(), "ocds-1-1")]
+                assert extracted == [releases[1], releases[3]]
+                assert list(extract_releases(writer.get_offsets_path(), "missing")) == []
+
+                for file in Path(self.config.directory).iterdir():
+                    file.unlink()
+
+    def test_offsets_compression(self):
+        with pytest.raises(ValueError, match="offsets can't be recorded if compression is set"):
+            Output(directory=self.config.directory, offsets=True, compression="gzip")
+
+    def test_stream_atomic(self):
+        for options in ({}, {"fsync": True, "flush_releases": 1}):
+            with self.subTest(**options):
+                writer = DataWriter(Output(directory=self.config.directory, **options))
+                writer.start_package_stream(self.package)
+                writer.stream_release({"id": "1"})
+
+                path = writer.get_output_path(self.package)
+                assert [file.name for file in Path(self.config.directory).iterdir()] == [f"{path.name}.partial"]
+
+                writer.end_package_stream()
+
+                assert [file.name for file in Path(self.config.directory).iterdir()] == [path.name]
+                path.unlink()
+
+    def test_fsync(self):
+        # The metadata, the two parts and the index are synced when closed, and then the directory, except on Windows.
+        expected = 4 if os.name == "nt" else 5
+        for compression in (None, "gzip", "zstd"):
+            with self.subTest(compression=compression):
+                writer = DataWriter(
+                    Output(
+                        directory=self.config.directory,
+                        format="jsonl",
+                        max_releases=1,
+                        fsync=True,
+                        compression=compression,
+                    )
+                )
+                with patch("nightingale.writer.os.fsync") as fsync:
+                    writer.start_package_stream(self.package)
+                    writer.stream_release({"id": "1"})
+                    writer.stream_release({"id": "2"})
+                    writer.end_package_stream()
+
+                assert fsync.call_count == expected
+                assert sorted(file.name for file in Path(self.config.directory).iterdir()) == [
+                    f"release-package-2022-01-01.00001{writer.get_extension()}",
+                    f"release-package-2022-01-01.00002{writer.get_extension()}",
+                    "release-package-2022-01-01.index.json",
+                    "release-package-2022-01-01.metadata.json",
+                ]
+
+                for file in Path(self.config.directory).iterdir():
+                    file.unlink()
+
+    def test_fsync_directory_windows(self):
+        path = Path(self.config.directory)
+        with patch("nightingale.writer.os.name", "nt"), patch("nightingale.writer.os.open") as os_open:
+            fsync_directory(path)
+        os_open.assert_not_called()
+
+    def test_abort_package_stream(self):
+        writer = DataWriter(Output(directory=self.config.directory, format="jsonl", max_releases=1, offsets=True))
+        writer.start_package_stream(self.package)
+        writer.stream_release({"id": "1"})
+        writer.stream_release({"id": "2"})
+        writer.abort_package_stream()
+
+        assert not writer.is_streaming()
+        assert not any(Path(self.config.directory).iterdir())
+        writer.end_package_stream()
+        assert not any(Path(self.config.directory).iterdir())
+
+    def test_write_releases(self):
+        releases = [{"id": "1", "tag": ["tender"]}, {"id": "2", "value": Decimal("1.5")}]
+        for output_format in ("pretty", "compact", "jsonl"):
+            for package in ({**self.package, "releases": releases}, releases):
+                with self.subTest(format=output_format, package=type(package).__name__):
+                    writer = DataWriter(Output(directory=self.config.directory, format=output_format))
+                    writer.write(package)
+
+                    text = writer.get_output_path(package).read_text()
+                    if output_format == "jsonl":
+                        assert [json.loads(line, use_decimal=True) for line in text.splitlines()] == releases
+                    else:
+                        assert json.loads(text, use_decimal=True) == package
+                    assert not writer.is_streaming()
+
+                    for file in Path(self.config.directory).iterdir():
+                        file.unlink()
+
 
 if __name__ == "__main__":
     unittest.main()